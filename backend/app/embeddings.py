@@ -0,0 +1,136 @@
+# embeddings.py
+import os
+
+import numpy as np
+
+# Which implementation embed_query/embed_documents use:
+#   onnx                  - exported model-quant.onnx + tokenizers, in process (no torch)
+#   http                  - POST /embed on the embeddings service
+#   sentence-transformers - the original SentenceTransformer model (needs torch)
+EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "onnx")
+MODEL_NAME = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+ONNX_MODEL_PATH = os.getenv("EMBED_ONNX_MODEL_PATH", "./model-quant.onnx")
+TOKENIZER_PATH = os.getenv("EMBED_TOKENIZER_PATH", "./tokenizer/tokenizer.json")
+MAX_SEQ_LENGTH = int(os.getenv("EMBED_MAX_SEQ_LENGTH", "256"))
+EMBEDDINGS_SERVICE_URL = os.getenv("EMBEDDINGS_SERVICE_URL", "http://localhost:8001")
+EMBEDDINGS_SERVICE_TIMEOUT = float(os.getenv("EMBEDDINGS_SERVICE_TIMEOUT", "10"))
+
+
+def _l2_normalize(vectors):
+    # The ONNX export only mean-pools; the SentenceTransformer pipeline the
+    # stored recipe embeddings came from also normalizes
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class EmbeddingProvider:
+    """Turns a batch of texts into embeddings (lists of floats), in input order."""
+
+    name = None
+
+    @classmethod
+    def check(cls):
+        """Raise if the provider cannot be built here; cheap, so the API can call it at startup."""
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """
+    The mean-pooling ONNX export of embeddings_service/export_to_onnx.py,
+    run with ONNX Runtime.
+    """
+
+    name = "onnx"
+
+    @classmethod
+    def check(cls):
+        missing = [path for path in (ONNX_MODEL_PATH, TOKENIZER_PATH) if not os.path.exists(path)]
+        if missing:
+            raise RuntimeError(
+                f"EMBED_PROVIDER=onnx needs {' and '.join(missing)}. Export them with "
+                "embeddings_service/export_to_onnx.py (the Docker build does this), point "
+                "EMBED_ONNX_MODEL_PATH/EMBED_TOKENIZER_PATH at them, or set EMBED_PROVIDER=http"
+            )
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, tokenizer_path=TOKENIZER_PATH, max_length=MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+
+    def embed(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        return _l2_normalize(self.session.run(None, inputs)[0]).tolist()
+
+
+class HttpEmbeddingProvider(EmbeddingProvider):
+    """Delegates to the embeddings service (embeddings_service/main.py), which returns the mean-pooled output."""
+
+    name = "http"
+
+    def __init__(self, url=EMBEDDINGS_SERVICE_URL, timeout=EMBEDDINGS_SERVICE_TIMEOUT):
+        import requests
+
+        self.url = url.rstrip("/") + "/embed"
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def embed(self, texts):
+        # Raw float32 rows instead of JSON number lists
+        response = self.session.post(
+            self.url,
+            json={"texts": list(texts)},
+            headers={"Accept": "application/octet-stream"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        rows, dim = (int(n) for n in response.headers["X-Embedding-Shape"].split(","))
+        return _l2_normalize(np.frombuffer(response.content, dtype="<f4").reshape(rows, dim)).tolist()
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    name = "sentence-transformers"
+
+    def __init__(self, model_name=MODEL_NAME):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBED_PROVIDER=sentence-transformers needs `pip install sentence-transformers` (and torch)"
+            ) from e
+        self.model = SentenceTransformer(model_name)
+
+    def embed(self, texts):
+        texts = list(texts)
+        return self.model.encode(texts, batch_size=len(texts), normalize_embeddings=False).tolist()
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (OnnxEmbeddingProvider, HttpEmbeddingProvider, SentenceTransformerProvider)
+}
+
+
+def _provider_class(name=None):
+    name = name or EMBED_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown EMBED_PROVIDER {name!r}; expected one of {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]
+
+
+def check_embedding_provider(name=None):
+    """Fail at startup, not on every chat request, when the configured provider is unusable."""
+    _provider_class(name).check()
+
+
+def create_embedding_provider(name=None):
+    return _provider_class(name)()
@@ -1,9 +1,11 @@
 # llm.py
 import os
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from sentence_transformers import SentenceTransformer
+
+from .registry import get_or_create
+from .embeddings import create_embedding_provider
 
 # --- Load .env explicitly ---
 # Zorg dat dit pad klopt met de locatie van je .env in het project
@@ -11,7 +13,9 @@ env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
 # --- LLM Factory ---
-def get_llm():
+def _create_llm():
+    from langchain_openai import ChatOpenAI
+
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY is missing. Set it in the environment or .env file")
@@ -22,15 +26,40 @@ def get_llm():
         model=model_name
     )
 
-# --- Embeddings Model ---
-MODEL_NAME = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-_model = None
+def get_llm():
+    # One client (and HTTP connection pool) per process
+    return get_or_create("llm", _create_llm)
+
+# --- Embeddings ---
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+
+def get_embedding_provider():
+    # Selected by EMBED_PROVIDER, see embeddings.py
+    return get_or_create("embedding_provider", create_embedding_provider)
+
+def _encode(texts):
+    """
+    Encode texts in batches of EMBED_BATCH_SIZE. Texts are sorted by length
+    first so each batch pads to similar lengths; results keep input order.
+    """
+    provider = get_embedding_provider()
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    vectors = [None] * len(texts)
+    for start in range(0, len(order), EMBED_BATCH_SIZE):
+        batch = order[start:start + EMBED_BATCH_SIZE]
+        encoded = provider.embed([texts[i] for i in batch])
+        for i, vector in zip(batch, encoded):
+            vectors[i] = vector
+    return vectors
+
+# Chat questions repeat (retries, cache lookups, retrieval); keep recent ones
+@lru_cache(maxsize=EMBED_CACHE_SIZE)
+def _embed_cached(text):
+    return tuple(_encode([text])[0])
 
 def embed_query(text: str):
-    global _model
-    if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
-    return _model.encode([text], normalize_embeddings=False)[0].tolist()
+    return list(_embed_cached(text))
 
 def embed_documents(texts: list[str]):
-    return [embed_query(t) for t in texts]
+    return _encode(list(texts)) if texts else []
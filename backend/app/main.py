@@ -1,16 +1,34 @@
-from fastapi import FastAPI, HTTPException, Query
+import time
+
+# Start of the app's own imports, for PROFILE_STARTUP / STARTUP_BUDGET
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
+import asyncio
+import hashlib
+import hmac
+import json
 import os
 
 from .services.recipe_queries import (
-    search_recipes, get_recipe_details, get_related_recipes,
-    get_all_countries, get_all_regions, get_all_methods,
-    get_all_ingredients, get_all_main_ingredients
+    search_recipes_with_mode, get_recipe_details, get_related_recipes,
+    encode_cursor, decode_cursor,
+    get_cached_filter_options
 )
-from .services.category_queries import get_category_counts, get_ingredients_az
-from .services.chat_agent import generate_response
+from .services.category_queries import get_category_counts, get_ingredients_az, suggest_ingredients
+from .services.data_version import refresh_caches
+from .services.neo4j import run_in_db_pool
+from .services.semantic_cache import get_semantic_cache
+from .embeddings import check_embedding_provider
+from .tools.cypher import get_cypher_cache
+
+_import_seconds = time.perf_counter() - _import_started
 
 app = FastAPI(title="Indonesische Recepten API")
 
@@ -28,6 +46,90 @@ app.add_middleware(
 )
 
 
+# Seconds between data-version checks; caches rebuild once after an import
+DATA_VERSION_CHECK_INTERVAL = float(os.getenv("DATA_VERSION_CHECK_INTERVAL", "300"))
+FILTERS_MAX_AGE = int(os.getenv("FILTERS_MAX_AGE", "300"))
+# PROFILE_STARTUP=1 prints the slowest calls of the cache warm-up. With
+# STARTUP_BUDGET (seconds), startup fails when importing the app plus the
+# warm-up take longer.
+PROFILE_STARTUP = os.getenv("PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET", "0"))
+
+
+async def watch_data_version():
+    while True:
+        await asyncio.sleep(DATA_VERSION_CHECK_INTERVAL)
+        try:
+            await run_in_threadpool(refresh_caches)
+        except Exception as e:
+            print(f"Error checking data version: {e}")
+
+
+def load_chat_agent():
+    # The agent pulls in langchain agents and the OpenAI client; import it on
+    # the first chat request instead of at startup
+    from .services import chat_agent
+    return chat_agent
+
+
+def warm_caches():
+    # Chat, related recipes and the semantic cache all need embeddings
+    check_embedding_provider()
+    return refresh_caches(True)
+
+
+def run_profiled(func):
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    return result
+
+
+@app.on_event("startup")
+async def load_caches():
+    # Search index, filters etc. are served from memory once this has run;
+    # until then (or without a database) they fall back to Cypher.
+    started = time.perf_counter()
+    if PROFILE_STARTUP:
+        await run_in_threadpool(run_profiled, warm_caches)
+    else:
+        await run_in_threadpool(warm_caches)
+    warm_up_seconds = time.perf_counter() - started
+    if PROFILE_STARTUP or STARTUP_BUDGET:
+        print(f"Startup: imports {_import_seconds:.2f}s, cache warm-up {warm_up_seconds:.2f}s")
+    if STARTUP_BUDGET and _import_seconds + warm_up_seconds > STARTUP_BUDGET:
+        raise RuntimeError(
+            f"Startup took {_import_seconds + warm_up_seconds:.2f}s, over STARTUP_BUDGET={STARTUP_BUDGET:g}s"
+        )
+    if DATA_VERSION_CHECK_INTERVAL > 0:
+        asyncio.create_task(watch_data_version())
+
+
+async def offload(func, *args, **kwargs):
+    # Neo4j calls are blocking; run them on the bounded DB pool so one slow
+    # query does not hold up every other request on the event loop.
+    try:
+        return await run_in_db_pool(func, *args, **kwargs)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Database query timed out")
+
+
+def require_admin(x_admin_token: Optional[str]):
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or not hmac.compare_digest((x_admin_token or "").encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 # Models
 class ChatRequest(BaseModel):
     message: str
@@ -44,53 +146,98 @@ async def api_search_recipes(
     ingredients: Optional[List[str]] = Query(None),
     main_ingredients: Optional[List[str]] = Query(None),
     limit: int = 24,
-    skip: int = 0
+    skip: int = 0,
+    after: Optional[str] = None
 ):
-    recipes, total = search_recipes(
+    # `after` is the opaque next_cursor of a previous page; `skip` stays
+    # supported but makes Neo4j sort and discard everything before it
+    try:
+        after_key = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    recipes, total, mode, next_key = await offload(
+        search_recipes_with_mode,
         countries=countries,
         regions=regions,
         methods=methods,
         ingredients=ingredients,
         main_ingredients=main_ingredients,
         limit=limit,
-        skip=skip
+        skip=skip,
+        after=after_key
     )
-    return {"recipes": recipes, "total": total}
+    next_cursor = encode_cursor(next_key) if next_key else None
+    return {"recipes": recipes, "total": total, "mode": mode, "next_cursor": next_cursor}
 
 @app.get("/api/recipes/{recipe_id:path}")
-async def api_get_recipe_details(recipe_id: str):
-    details = get_recipe_details(recipe_id)
+async def api_get_recipe_details(recipe_id: str, stream: bool = False):
+    # Details and related recipes are independent; start both right away
+    related_task = asyncio.ensure_future(offload(get_related_recipes, recipe_id))
+    try:
+        details = await offload(get_recipe_details, recipe_id)
+    except Exception:
+        related_task.cancel()
+        raise
     if not details:
+        related_task.cancel()
         raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    related = get_related_recipes(recipe_id)
+
+    if stream:
+        # NDJSON: the recipe as the first line, related recipes as the second,
+        # so the page can render before the vector search has finished.
+        async def parts():
+            yield json.dumps(jsonable_encoder({"recipe": details['recipe'], "ingredients": details['ingredients']})) + "\n"
+            try:
+                related = await related_task
+            except HTTPException:
+                related = []
+            yield json.dumps(jsonable_encoder({"related": related})) + "\n"
+
+        return StreamingResponse(parts(), media_type="application/x-ndjson")
+
+    related = await related_task
     return {"recipe": details['recipe'], "ingredients": details['ingredients'], "related": related}
 
 @app.get("/api/categories")
 async def api_get_categories(type: str):
-    counts = get_category_counts(type)
+    counts = await offload(get_category_counts, type)
     return counts
 
 @app.get("/api/ingredients/az")
 async def api_get_ingredients_az(letter: Optional[str] = None):
-    return get_ingredients_az(letter)
+    return await offload(get_ingredients_az, letter)
+
+@app.get("/api/ingredients/suggest")
+async def api_suggest_ingredients(q: str = "", limit: int = Query(10, ge=1, le=50)):
+    return await offload(suggest_ingredients, q, limit)
 
 @app.get("/api/filters")
-async def api_get_filters():
-    return {
-        "countries": get_all_countries(),
-        "regions": get_all_regions(),
-        "methods": get_all_methods(),
-        "ingredients": get_all_ingredients(),
-        "main_ingredients": get_all_main_ingredients()
+async def api_get_filters(request: Request, ingredients: bool = True):
+    version, options = await offload(get_cached_filter_options)
+    if not ingredients:
+        # Clients with autocomplete (/api/ingredients/suggest) skip the full list
+        options = dict(options, ingredients=[])
+    etag = '"filters-%s-%d"' % (hashlib.sha1(str(version).encode()).hexdigest()[:16], ingredients)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={FILTERS_MAX_AGE}, must-revalidate",
     }
+    if not any(options.values()):
+        # Nothing loaded (no database yet); let clients ask again
+        headers["Cache-Control"] = "no-store"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(options, headers=headers)
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def api_chat(request: ChatRequest):
     print(f"DEBUG: Chat request received: {request.message}")
     try:
         print("DEBUG: Calling generate_response...")
-        response = generate_response(request.message, request.session_id)
+        # The agent makes several LLM calls; keep it off the event loop too
+        chat_agent = await run_in_threadpool(load_chat_agent)
+        response = await run_in_threadpool(chat_agent.generate_response, request.message, request.session_id)
         print(f"DEBUG: Response generated: {response[:100]}...")
         return ChatResponse(response=response)
     except Exception as e:
@@ -99,6 +246,36 @@ async def api_chat(request: ChatRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+async def api_chat_stream(request: ChatRequest):
+    # Server-Sent Events: tool steps while the agent works, then the final
+    # answer token by token. /api/chat keeps the single ChatResponse.
+    async def events():
+        try:
+            chat_agent = await run_in_threadpool(load_chat_agent)
+            async for event in chat_agent.astream_response(request.message, request.session_id):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            print(f"DEBUG: Exception in api_chat_stream: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/chat/cache")
+async def api_chat_cache_stats():
+    return dict(get_semantic_cache().stats(), cypher=get_cypher_cache().stats())
+
+@app.post("/api/admin/refresh")
+async def api_refresh(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return await run_in_threadpool(refresh_caches, True)
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
@@ -0,0 +1,20 @@
+# registry.py
+import threading
+
+# Process-wide instances (LLM client, retrieval and Cypher chains) that are
+# expensive to construct and safe to share between requests and sessions.
+_instances = {}
+_lock = threading.RLock()  # re-entrant: factories may fetch other instances
+
+
+def get_or_create(name, factory):
+    """Return the instance registered as `name`, building it with `factory()` on first use."""
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
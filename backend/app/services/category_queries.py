@@ -1,64 +1,89 @@
+import threading
+
 from .neo4j import get_neo4j_service
+from .data_version import register_rebuild
+from .ingredient_lexicon import get_ingredient_lexicon
 
-def get_category_counts(category_type):
-    neo4j = get_neo4j_service()
-    
-    # Map frontend keys to backend logic
-    category_type = category_type.lower()
-    
-    if category_type == "country":
-        query = """
+# head(collect(r.schema__image)) picks the first recipe image for the
+# category thumbnail; collect() skips nulls, so no recipe nodes are held.
+CATEGORY_QUERIES = {
+    "country": """
         MATCH (c:schema__DefinedTerm {kb__categoryType: 'cuisine'})<-[:schema__recipeCuisine]-(r:schema__Recipe)
-        WITH c, count(r) AS recipeCount, collect(r) as recipes
-        // Get first recipe with an image for the category thumbnail
-        WITH c, recipeCount, [r in recipes WHERE r.schema__image IS NOT NULL][0] as sample
-        RETURN c.schema__name AS name, recipeCount, sample.schema__image AS image
+        WITH c, count(r) AS recipeCount, head(collect(r.schema__image)) AS image
+        RETURN c.schema__name AS name, recipeCount, image
         ORDER BY recipeCount DESC
-        """
-    elif category_type == "region":
-        query = """
+        """,
+    "region": """
         MATCH (c)<-[:kb__hasCuisineRegion]-(r:schema__Recipe)
-        WITH c, count(r) AS recipeCount, collect(r) as recipes
-        WITH c, recipeCount, [r in recipes WHERE r.schema__image IS NOT NULL][0] as sample
-        RETURN coalesce(c.rdfs__label, last(split(c.uri, '/'))) AS name, recipeCount, sample.schema__image AS image
+        WITH c, count(r) AS recipeCount, head(collect(r.schema__image)) AS image
+        RETURN coalesce(c.rdfs__label, last(split(c.uri, '/'))) AS name, recipeCount, image
         ORDER BY recipeCount DESC
-        """
-    elif category_type == "method":
-        query = """
+        """,
+    "method": """
         MATCH (c:schema__DefinedTerm {kb__categoryType: 'cooking_method'})<-[:kb__usesCookingMethod]-(r:schema__Recipe)
-        WITH c, count(r) AS recipeCount, collect(r) as recipes
-        WITH c, recipeCount, [r in recipes WHERE r.schema__image IS NOT NULL][0] as sample
-        RETURN c.schema__name AS name, recipeCount, sample.schema__image AS image
+        WITH c, count(r) AS recipeCount, head(collect(r.schema__image)) AS image
+        RETURN c.schema__name AS name, recipeCount, image
         ORDER BY recipeCount DESC
-        """
-    elif category_type == "main_ingredient":
-        query = """
+        """,
+    "main_ingredient": """
         MATCH (c:schema__DefinedTerm)<-[:kb__hasPrimaryIngredient]-(r:schema__Recipe)
-        WITH c, count(r) AS recipeCount, collect(r) as recipes
-        WITH c, recipeCount, [r in recipes WHERE r.schema__image IS NOT NULL][0] as sample
-        RETURN c.schema__name AS name, recipeCount, sample.schema__image AS image
+        WITH c, count(r) AS recipeCount, head(collect(r.schema__image)) AS image
+        RETURN c.schema__name AS name, recipeCount, image
         ORDER BY recipeCount DESC
-        """
-    elif category_type == "ingredient":
-        # For the discovery page, we might want top ingredients with images
-        query = """
+        """,
+    # For the discovery page: top ingredients with images
+    "ingredient": """
         MATCH (c:kb__Ingredient)<-[:kb__ingredient]-(:kb__IngredientUsage)<-[:kb__hasIngredientUsage]-(r:schema__Recipe)
-        WITH c.rdfs__label AS name, count(r) AS recipeCount, collect(r) as recipes
-        WITH name, recipeCount, [r in recipes WHERE r.schema__image IS NOT NULL][0] as sample
-        RETURN name, recipeCount, sample.schema__image AS image
+        WITH c.rdfs__label AS name, count(r) AS recipeCount, head(collect(r.schema__image)) AS image
+        RETURN name, recipeCount, image
         ORDER BY recipeCount DESC
         LIMIT 50
-        """
-    else:
+        """,
+}
+
+# Counts per category type, materialized once per data version so the
+# categories page does not aggregate the whole graph on every request.
+_category_cache = {}
+_category_cache_lock = threading.Lock()
+
+def query_category_counts(category_type):
+    neo4j = get_neo4j_service()
+    return neo4j.query(CATEGORY_QUERIES[category_type])
+
+def rebuild_category_counts():
+    counts = {}
+    for category_type in CATEGORY_QUERIES:
+        counts[category_type] = query_category_counts(category_type)
+    with _category_cache_lock:
+        _category_cache.clear()
+        _category_cache.update(counts)
+    return counts
+
+def get_category_counts(category_type):
+    # Map frontend keys to backend logic
+    category_type = category_type.lower()
+    if category_type not in CATEGORY_QUERIES:
         return []
+
+    with _category_cache_lock:
+        cached = _category_cache.get(category_type)
+    if cached is not None:
+        return [dict(row) for row in cached]
     
     try:
-        return neo4j.query(query)
+        return query_category_counts(category_type)
     except Exception as e:
         print(f"Error getting category counts for {category_type}: {e}")
         return []
 
+register_rebuild("categories", rebuild_category_counts)
+
 def get_ingredients_az(letter=None):
+    # `letter` may be any prefix; served from the in-memory lexicon once loaded
+    lexicon = get_ingredient_lexicon()
+    if lexicon is not None:
+        return lexicon.prefix(letter)
+
     neo4j = get_neo4j_service()
     
     where_clause = ""
@@ -75,3 +100,13 @@ def get_ingredients_az(letter=None):
     ORDER BY name ASC
     """
     return neo4j.query(query, params)
+
+def suggest_ingredients(query, limit=10):
+    lexicon = get_ingredient_lexicon()
+    if lexicon is not None:
+        return lexicon.suggest(query, limit)
+
+    # Lexicon not loaded yet: plain prefix match, most used first
+    matches = get_ingredients_az(query) if query else []
+    matches = sorted(matches, key=lambda r: r['recipeCount'], reverse=True)[:limit]
+    return [dict(r, match="prefix") for r in matches]
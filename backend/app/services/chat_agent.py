@@ -1,16 +1,20 @@
-from langchain_neo4j import Neo4jChatMessageHistory
+import asyncio
+
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain.tools import Tool
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
 from langchain.schema import StrOutputParser
 
-from ..llm import get_llm
-from .neo4j import get_neo4j_service
+from ..llm import get_llm, embed_query
+from ..registry import get_or_create
+from .chat_memory import SummarizedChatHistory
+from .semantic_cache import get_semantic_cache, cache_enabled
+from .query_router import route_query
 from ..tools.vector import get_recipe
 from ..tools.cypher import cypher_qa
 
-def get_recipe_chat_chain():
+def _create_recipe_chat_chain():
     chat_prompt = ChatPromptTemplate.from_messages(
         [
             ("system", "Je ben een recepten-expert die informatie over recepten kan geven."),
@@ -20,6 +24,9 @@ def get_recipe_chat_chain():
     llm = get_llm()
     return chat_prompt | llm | StrOutputParser()
 
+def get_recipe_chat_chain():
+    return get_or_create("recipe_chat_chain", _create_recipe_chat_chain)
+
 def get_agent_tools():
     recipe_chat = get_recipe_chat_chain()
     
@@ -42,8 +49,8 @@ def get_agent_tools():
     ]
 
 def get_memory(session_id):
-    neo4j_service = get_neo4j_service()
-    return Neo4jChatMessageHistory(session_id=session_id, graph=neo4j_service.graph)
+    # Last turns verbatim plus a rolling summary, instead of the full history
+    return SummarizedChatHistory(session_id)
 
 def initialize_agent():
     tools = get_agent_tools()
@@ -111,18 +118,132 @@ def initialize_agent():
     
     return chat_agent
 
-_chat_agent_instance = None
-
 def get_chat_agent():
-    global _chat_agent_instance
-    if _chat_agent_instance is None:
-        _chat_agent_instance = initialize_agent()
-    return _chat_agent_instance
+    return get_or_create("chat_agent", initialize_agent)
+
+def _lookup_cached_answer(user_input, session_id):
+    """
+    Returns (cached_answer, embedding, is_opening_turn). On a hit the turn is
+    recorded in the session history as if the agent had answered, so
+    follow-up questions still see it.
+    """
+    if not cache_enabled():
+        return None, None, False
+    try:
+        # Only opening questions are looked up and stored: later turns may
+        # lean on the conversation so far ("en zonder kokosmelk?"), and their
+        # answer does not stand on its own
+        if get_memory(session_id).messages:
+            return None, None, False
+        embedding = embed_query(user_input)
+        cached = get_semantic_cache().lookup(user_input, embedding)
+    except Exception as e:
+        # The cache is an optimization; let the agent answer instead
+        print(f"Error looking up cached answer: {e}")
+        return None, None, False
+    if cached is not None:
+        history = get_memory(session_id)
+        history.add_user_message(user_input)
+        history.add_ai_message(cached)
+        return cached, embedding, False
+    return None, embedding, True
+
+def _store_answer(user_input, embedding, output, is_opening_turn):
+    if embedding is not None and is_opening_turn:
+        get_semantic_cache().store(user_input, embedding, output)
+
+def _route_structured(user_input, session_id):
+    """
+    Answers plain filter questions ("5 Thaise recepten met kip") from the
+    search index, without the agent. Returns None for anything else.
+    """
+    answer = route_query(user_input)
+    if answer is not None:
+        history = get_memory(session_id)
+        history.add_user_message(user_input)
+        history.add_ai_message(answer)
+    return answer
 
 def generate_response(user_input, session_id):
+    routed = _route_structured(user_input, session_id)
+    if routed is not None:
+        return routed
+
+    cached, embedding, is_opening_turn = _lookup_cached_answer(user_input, session_id)
+    if cached is not None:
+        return cached
+
     agent = get_chat_agent()
     response = agent.invoke(
         {"input": user_input},
         {"configurable": {"session_id": session_id}},
     )
-    return response['output']
+    output = response['output']
+    _store_answer(user_input, embedding, output, is_opening_turn)
+    return output
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+async def astream_response(user_input, session_id):
+    """
+    Runs the agent and yields events as they happen:
+      {"type": "tool_start", "tool", "input"} / {"type": "tool_end", "tool", "output"}
+      {"type": "token", "text"}  - final answer, token by token
+      {"type": "done", "response"}  - the complete final answer
+    """
+    routed = await asyncio.to_thread(_route_structured, user_input, session_id)
+    if routed is not None:
+        yield {"type": "token", "text": routed}
+        yield {"type": "done", "response": routed, "routed": True}
+        return
+
+    cached, embedding, is_opening_turn = await asyncio.to_thread(
+        _lookup_cached_answer, user_input, session_id
+    )
+    if cached is not None:
+        yield {"type": "token", "text": cached}
+        yield {"type": "done", "response": cached, "cached": True}
+        return
+
+    agent = get_chat_agent()
+    tool_runs = set()
+    llm_text = {}   # agent LLM run id -> text generated so far
+    answer_sent = {}  # agent LLM run id -> length of the answer already streamed
+    output = None
+
+    async for event in agent.astream_events(
+        {"input": user_input},
+        {"configurable": {"session_id": session_id}},
+        version="v2",
+    ):
+        kind = event["event"]
+        if kind == "on_tool_start":
+            tool_runs.add(event["run_id"])
+            yield {"type": "tool_start", "tool": event["name"], "input": str(event["data"].get("input", ""))}
+        elif kind == "on_tool_end":
+            tool_runs.discard(event["run_id"])
+            yield {"type": "tool_end", "tool": event["name"], "output": str(event["data"].get("output", ""))[:500]}
+        elif kind == "on_chat_model_stream":
+            # LLM calls made inside a tool (retrieval QA, Cypher generation)
+            # are not part of the answer
+            if tool_runs.intersection(event.get("parent_ids", [])):
+                continue
+            run_id = event["run_id"]
+            llm_text[run_id] = text = llm_text.get(run_id, "") + (event["data"]["chunk"].content or "")
+            marker = text.find(FINAL_ANSWER_MARKER)
+            if marker == -1:
+                continue
+            answer = text[marker + len(FINAL_ANSWER_MARKER):].lstrip()
+            new_text = answer[answer_sent.get(run_id, 0):]
+            answer_sent[run_id] = len(answer)
+            if new_text:
+                yield {"type": "token", "text": new_text}
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            result = event["data"].get("output")
+            if isinstance(result, dict):
+                output = result.get("output")
+
+    if output is None:
+        output = ""
+    _store_answer(user_input, embedding, output, is_opening_turn)
+    yield {"type": "done", "response": output}
@@ -0,0 +1,282 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import SystemMessage, messages_from_dict
+from langchain_core.prompts import PromptTemplate
+from langchain.schema import StrOutputParser
+
+from ..llm import get_llm
+from ..registry import get_or_create
+from .neo4j import get_neo4j_service
+
+# Turns (question + answer) passed to the agent verbatim; older turns are
+# folded into a rolling summary every SUMMARY_EVERY turns. Until a fold has
+# taken them, turns that left the window are still passed verbatim.
+MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "3"))
+SUMMARY_EVERY = int(os.getenv("CHAT_SUMMARY_EVERY", "4"))
+# Background summarization threads; kept off the Neo4j offload pool so slow
+# LLM calls never hold up request handlers
+SUMMARY_WORKERS = int(os.getenv("CHAT_SUMMARY_WORKERS", "1"))
+# Sessions whose window is kept in process; 0 reads Neo4j on every turn
+MEMORY_CACHE_SIZE = int(os.getenv("CHAT_MEMORY_CACHE_SIZE", "256"))
+
+# Same Session/Message layout as langchain's Neo4jChatMessageHistory
+# (Session-[:LAST_MESSAGE]->Message, older-[:NEXT]->newer), plus a message
+# count and the summary on the Session node.
+WINDOW_QUERY = """
+MATCH (s:Session {{id: $session_id}})
+OPTIONAL MATCH (s)-[:LAST_MESSAGE]->(last:Message)
+OPTIONAL MATCH p = (last)<-[:NEXT*0..{depth}]-(:Message)
+WITH s, p ORDER BY length(p) DESC LIMIT 1
+RETURN s.summary AS summary,
+       s.messageCount AS count,
+       coalesce(s.summarizedCount, 0) AS summarized,
+       CASE WHEN p IS NULL THEN [] ELSE [n IN reverse(nodes(p)) | {{type: n.type, content: n.content}}] END AS messages
+"""
+
+# Cheap check of a cached session against writes by other processes
+COUNTS_QUERY = """
+MATCH (s:Session {id: $session_id})
+RETURN s.messageCount AS count, coalesce(s.summarizedCount, 0) AS summarized
+"""
+
+# Sessions written before messageCount existed: count their chain once
+BACKFILL_COUNT_QUERY = """
+MATCH (s:Session {id: $session_id})
+WHERE s.messageCount IS NULL
+OPTIONAL MATCH (s)-[:LAST_MESSAGE]->(last:Message)
+OPTIONAL MATCH (last)<-[:NEXT*0..]-(m:Message)
+WITH s, count(m) AS total
+SET s.messageCount = total
+RETURN total
+"""
+
+# Messages [start, end] counted from the first message of the session, oldest
+# first. Anchored at the start of the chain, so messages appended meanwhile
+# do not shift the selection.
+OLDER_MESSAGES_QUERY = """
+MATCH (s:Session {{id: $session_id}})-[:LAST_MESSAGE]->(last:Message)
+MATCH (last)<-[:NEXT*0..]-(first:Message)
+WHERE NOT (first)<-[:NEXT]-(:Message)
+MATCH p = (first)-[:NEXT*{start}..{end}]->(m:Message)
+WITH m, length(p) AS position ORDER BY position
+RETURN m.type AS type, m.content AS content
+"""
+
+ADD_MESSAGE_QUERY = """
+MERGE (s:Session {id: $session_id})
+WITH s
+OPTIONAL MATCH (s)-[lm:LAST_MESSAGE]->(last:Message)
+CREATE (s)-[:LAST_MESSAGE]->(new:Message {type: $type, content: $content})
+SET s.messageCount = coalesce(s.messageCount, 0) + 1
+WITH new, lm, last
+WHERE last IS NOT NULL
+CREATE (last)-[:NEXT]->(new)
+DELETE lm
+"""
+
+# Only applies on top of the summary it extends; a concurrent fold from
+# another process wins otherwise
+SAVE_SUMMARY_QUERY = """
+MATCH (s:Session {id: $session_id})
+WHERE coalesce(s.summarizedCount, 0) = $previous
+SET s.summary = $summary, s.summarizedCount = $summarized
+RETURN s.summarizedCount AS summarized
+"""
+
+CLEAR_QUERY = """
+MATCH (s:Session {id: $session_id})
+OPTIONAL MATCH (s)-[:LAST_MESSAGE]->(last:Message)
+OPTIONAL MATCH (last)<-[:NEXT*0..]-(m:Message)
+DETACH DELETE s, m
+"""
+
+SUMMARY_TEMPLATE = """
+Vat het gesprek tussen een gebruiker en de SpiceRoute Assistant beknopt samen.
+Bewaar genoemde recepten, keukens, ingrediënten en voorkeuren van de gebruiker.
+
+Huidige samenvatting:
+{summary}
+
+Nieuwe gespreksregels:
+{lines}
+
+Nieuwe samenvatting:
+"""
+
+
+def _create_summary_chain():
+    return PromptTemplate.from_template(SUMMARY_TEMPLATE) | get_llm() | StrOutputParser()
+
+
+def get_summary_chain():
+    return get_or_create("chat_summary_chain", _create_summary_chain)
+
+
+def get_summary_executor():
+    return get_or_create(
+        "chat_summary_executor",
+        lambda: ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="chat-summary"),
+    )
+
+
+class _SessionCache:
+    """Window, summary and counters of recently active sessions, LRU-evicted."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # session id -> state dict
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            state = self._entries.get(session_id)
+            if state is not None:
+                self._entries.move_to_end(session_id)
+                return dict(state, messages=list(state["messages"]))
+            return None
+
+    def put(self, session_id, state):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = state
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def update(self, session_id, func):
+        with self._lock:
+            state = self._entries.get(session_id)
+            if state is not None:
+                func(state)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+_sessions = _SessionCache(MEMORY_CACHE_SIZE)
+_folding = set()  # sessions with a summary update in flight
+_folding_lock = threading.Lock()
+
+
+class SummarizedChatHistory(BaseChatMessageHistory):
+    """
+    Chat history that hands the agent a rolling summary plus every message
+    the summary does not cover yet: at least the last `turns` turns, normally
+    at most `summary_every` more. Reads fetch a bounded slice from Neo4j (or the
+    in-process session cache), however long the session is.
+    """
+
+    def __init__(self, session_id, turns=MEMORY_TURNS, summary_every=SUMMARY_EVERY):
+        self.session_id = session_id
+        self.window = 2 * turns
+        self.summary_every = summary_every
+        # Messages kept per session: the window, one fold's worth, and room
+        # for another batch to arrive while that fold is in flight
+        self.keep = self.window + 4 * summary_every
+
+    def _load(self):
+        state = _sessions.get(self.session_id)
+        if state is not None:
+            # Another worker may have added to or summarized this session
+            rows = get_neo4j_service().query(COUNTS_QUERY, {"session_id": self.session_id})
+            if rows and (rows[0]["count"], rows[0]["summarized"]) == (state["count"], state["summarized"]):
+                return state
+        rows = get_neo4j_service().query(
+            WINDOW_QUERY.format(depth=max(self.keep - 1, 0)),
+            {"session_id": self.session_id},
+        )
+        if rows:
+            row = rows[0]
+            count = row["count"]
+            if count is None:
+                backfill = get_neo4j_service().query(BACKFILL_COUNT_QUERY, {"session_id": self.session_id})
+                count = backfill[0]["total"] if backfill else len(row["messages"])
+            state = {
+                "summary": row["summary"],
+                "count": count,
+                "summarized": row["summarized"],
+                "messages": row["messages"][-self.keep:] if self.keep else [],
+            }
+        else:
+            state = {"summary": None, "count": 0, "summarized": 0, "messages": []}
+        _sessions.put(self.session_id, state)
+        return dict(state, messages=list(state["messages"]))
+
+    @property
+    def messages(self):
+        state = self._load()
+        unsummarized = max(self.window, state["count"] - state["summarized"])
+        recent = state["messages"][-unsummarized:] if unsummarized else []
+        messages = messages_from_dict(
+            [{"type": m["type"], "data": {"content": m["content"]}} for m in recent]
+        )
+        if state["summary"]:
+            messages.insert(0, SystemMessage(content=f"Samenvatting van het eerdere gesprek: {state['summary']}"))
+        return messages
+
+    def add_message(self, message):
+        get_neo4j_service().query(
+            ADD_MESSAGE_QUERY,
+            {"session_id": self.session_id, "type": message.type, "content": message.content},
+        )
+
+        def append(state):
+            state["messages"] = (state["messages"] + [{"type": message.type, "content": message.content}])[-self.keep:]
+            state["count"] += 1
+
+        _sessions.update(self.session_id, append)
+
+        # Summarize after an answer, in the background, so the turn that
+        # pushes messages out of the window does not wait for the LLM. The
+        # messages waiting for it are still in `messages` meanwhile.
+        if message.type == "ai":
+            state = self._load()
+            if state["count"] - self.window - state["summarized"] >= 2 * self.summary_every:
+                with _folding_lock:
+                    if self.session_id in _folding:
+                        return
+                    _folding.add(self.session_id)
+                get_summary_executor().submit(self._fold, state)
+
+    def _fold(self, state):
+        try:
+            self._summarize(state)
+        finally:
+            with _folding_lock:
+                _folding.discard(self.session_id)
+
+    def _summarize(self, state):
+        pending = state["count"] - self.window - state["summarized"]
+        try:
+            rows = get_neo4j_service().query(
+                OLDER_MESSAGES_QUERY.format(start=state["summarized"], end=state["summarized"] + pending - 1),
+                {"session_id": self.session_id},
+            )
+            lines = "\n".join(
+                f"{'Gebruiker' if r['type'] == 'human' else 'Assistent'}: {r['content']}" for r in rows
+            )
+            summary = get_summary_chain().invoke({"summary": state["summary"] or "(geen)", "lines": lines})
+        except Exception as e:
+            print(f"Error summarizing chat session {self.session_id}: {e}")
+            return
+
+        summarized = state["summarized"] + pending
+        saved = get_neo4j_service().query(
+            SAVE_SUMMARY_QUERY,
+            {"session_id": self.session_id, "summary": summary, "summarized": summarized,
+             "previous": state["summarized"]},
+        )
+        if not saved:
+            _sessions.discard(self.session_id)
+            return
+        _sessions.update(self.session_id, lambda s: s.update(summary=summary, summarized=summarized))
+
+    def clear(self):
+        get_neo4j_service().query(CLEAR_QUERY, {"session_id": self.session_id})
+        _sessions.discard(self.session_id)
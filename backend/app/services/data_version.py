@@ -0,0 +1,72 @@
+import threading
+import time
+
+from .neo4j import get_neo4j_service
+
+# The import tools stamp (:kb__DataVersion {id: 'graph'}) after loading the
+# TTL or embeddings. Graphs imported before that existed fall back to a
+# fingerprint of the node and relationship counts; unfiltered counts are
+# answered from Neo4j's count store, not by scanning.
+DATA_VERSION_QUERY = """
+OPTIONAL MATCH (v:kb__DataVersion {id: 'graph'})
+CALL { MATCH (n) RETURN count(n) AS nodes }
+CALL { MATCH ()-[r]->() RETURN count(r) AS relationships }
+RETURN v.version AS version, nodes, relationships
+"""
+
+_version = None
+_rebuilders = {}
+_refresh_lock = threading.Lock()
+
+
+def register_rebuild(name, rebuild):
+    """Register a cache that must be rebuilt whenever the graph data version changes."""
+    _rebuilders[name] = rebuild
+
+
+def get_data_version():
+    return _version
+
+
+def fetch_data_version():
+    results = get_neo4j_service().query(DATA_VERSION_QUERY)
+    if not results:
+        return None
+    row = results[0]
+    if row.get("version") is not None:
+        return str(row["version"])
+    return f"{row['nodes']}-{row['relationships']}"
+
+
+def refresh_caches(force=False):
+    """
+    Re-read the data version and rebuild every registered cache if it
+    changed (or when forced). Returns a summary per cache, or None when
+    nothing had to be rebuilt.
+    """
+    global _version
+    with _refresh_lock:
+        try:
+            version = fetch_data_version()
+        except Exception as e:
+            print(f"Error reading data version: {e}")
+            version = None
+
+        # An unreadable version (no database, query error) counts as unchanged;
+        # caches rebuild once it can be read again and differs
+        if not force and (version is None or version == _version):
+            return None
+
+        _version = version
+        summary = {"data_version": version}
+        for name, rebuild in _rebuilders.items():
+            start = time.perf_counter()
+            try:
+                result = rebuild()
+                summary[name] = len(result) if hasattr(result, "__len__") else result
+            except Exception as e:
+                print(f"Error rebuilding {name} cache: {e}")
+                summary[name] = None
+            print(f"Rebuilt {name} cache in {time.perf_counter() - start:.2f}s")
+        return summary
+
@@ -0,0 +1,170 @@
+import heapq
+import json
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+from .neo4j import get_neo4j_service
+from .data_version import register_rebuild
+
+LEXICON_QUERY = """
+MATCH (i:kb__Ingredient)<-[:kb__ingredient]-(:kb__IngredientUsage)<-[:kb__hasIngredientUsage]-(r:schema__Recipe)
+RETURN i.rdfs__label AS name, count(r) AS recipeCount
+"""
+
+
+# alias -> label used in the graph, shared with scraper/consolidate.py
+SYNONYMS_PATH = Path(__file__).resolve().parent.parent / "data" / "ingredient_synonyms.json"
+with open(SYNONYMS_PATH, encoding="utf-8") as f:
+    SYNONYM_MAP = json.load(f)
+
+# Shorter words get too many one-edit neighbours to be useful
+MIN_FUZZY_LENGTH = 4
+
+# Exact prefix and synonym hits rank above typo corrections
+MATCH_RANK = {"prefix": 0, "synonym": 0, "fuzzy": 1}
+
+
+def normalize(text):
+    return " ".join((text or "").casefold().split())
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution or transposition."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (
+            len(diff) == 2 and diff[1] == diff[0] + 1
+            and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+        )
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class IngredientLexicon:
+    """
+    Sorted ingredient labels with their recipe counts. A prefix is a
+    contiguous slice of the sorted keys, found with two bisections.
+
+    For typo tolerance every label word is also indexed under its one-letter
+    deletions (symmetric-delete lookup), so a misspelled word finds its
+    candidates with a few dict lookups instead of a scan.
+    """
+
+    def __init__(self, rows):
+        # Ingredient nodes can share a label; count them as one, like the
+        # `sum(recipeCount)` grouping of the A-Z query did
+        counts = {}
+        for r in rows:
+            if r.get("name"):
+                counts[r["name"]] = counts.get(r["name"], 0) + r["recipeCount"]
+        entries = sorted((normalize(name), name, count) for name, count in counts.items())
+        self.keys = [e[0] for e in entries]
+        self.names = [e[1] for e in entries]
+        self.counts = [e[2] for e in entries]
+
+        self._fuzzy = {}
+        for i, key in enumerate(self.keys):
+            for word in set(key.split()):
+                if len(word) < MIN_FUZZY_LENGTH:
+                    continue
+                for variant in _deletes(word) | {word}:
+                    self._fuzzy.setdefault(variant, []).append((word, i))
+
+        self._synonyms = [(normalize(alias), normalize(label)) for alias, label in SYNONYM_MAP.items()]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _entry(self, i):
+        return {"name": self.names[i], "recipeCount": self.counts[i]}
+
+    def prefix_range(self, prefix):
+        prefix = normalize(prefix)
+        if not prefix:
+            return 0, len(self.keys)
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        return lo, hi
+
+    def prefix(self, prefix):
+        """All ingredients starting with `prefix`, alphabetically."""
+        lo, hi = self.prefix_range(prefix)
+        return [self._entry(i) for i in range(lo, hi)]
+
+    def top(self, prefix, limit=10):
+        """The `limit` ingredients starting with `prefix` that occur in the most recipes."""
+        lo, hi = self.prefix_range(prefix)
+        best = heapq.nlargest(limit, range(lo, hi), key=self.counts.__getitem__)
+        return [self._entry(i) for i in best]
+
+    def suggest(self, query, limit=10):
+        """
+        Autocomplete: labels starting with `query`, labels whose synonym
+        starts with it (e.g. 'sant' -> kokosmelk) and, when that leaves room,
+        labels with a word one typo away from the last word typed.
+        Ranked by match kind, then by recipe count; an exact label comes
+        first, so clients can validate typed input against the result.
+        """
+        query = normalize(query)
+        if not query:
+            return [dict(entry, match="prefix") for entry in self.top("", limit)]
+        matches = {}
+
+        def add(indices, kind):
+            for i in indices:
+                matches.setdefault(i, kind)
+
+        add(range(*self.prefix_range(query)), "prefix")
+        for alias, label in self._synonyms:
+            if alias.startswith(query):
+                add(range(*self.prefix_range(label)), "synonym")
+
+        word = query.split()[-1]
+        if len(matches) < limit and len(word) >= MIN_FUZZY_LENGTH:
+            for variant in _deletes(word) | {word}:
+                for candidate, i in self._fuzzy.get(variant, ()):
+                    if within_one_edit(word, candidate):
+                        add((i,), "fuzzy")
+
+        best = heapq.nsmallest(
+            limit, matches.items(),
+            key=lambda item: (
+                self.keys[item[0]] != query, MATCH_RANK[item[1]], -self.counts[item[0]], self.keys[item[0]]
+            ),
+        )
+        return [dict(self._entry(i), match=kind) for i, kind in best]
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def get_ingredient_lexicon():
+    return _lexicon
+
+
+def refresh_ingredient_lexicon():
+    global _lexicon
+    with _lexicon_lock:
+        rows = get_neo4j_service().query(LEXICON_QUERY)
+        if rows:
+            _lexicon = IngredientLexicon(rows)
+        return _lexicon
+
+
+register_rebuild("ingredient_lexicon", refresh_ingredient_lexicon)
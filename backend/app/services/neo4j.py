@@ -1,5 +1,8 @@
 import os
-from langchain_neo4j import Neo4jGraph
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -7,31 +10,131 @@ from pathlib import Path
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-def get_graph_connection():
+# One driver (and thus one connection pool) is shared by every request.
+# The offload pool is sized to match, so requests never wait on a
+# connection while holding a worker thread.
+POOL_SIZE = int(os.getenv("NEO4J_POOL_SIZE", "10"))
+QUERY_TIMEOUT = float(os.getenv("NEO4J_QUERY_TIMEOUT", "30"))
+
+def get_driver():
+    # The API's own queries only need the plain driver, so cache warm-up at
+    # startup does not import langchain_neo4j
+    from neo4j import GraphDatabase
+    try:
+        driver = GraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+            max_connection_pool_size=POOL_SIZE,
+        )
+        driver.verify_connectivity()
+        return driver
+    except Exception as e:
+        print(f"Failed to connect to Neo4j: {e}")
+        return None
+
+def get_graph_connection(driver):
+    # langchain's Neo4jGraph, for the chat tools (Neo4jVector), on the
+    # shared driver. Neo4jGraph cannot be handed a driver, so the
+    # single-connection one it opens to check connectivity is closed and
+    # replaced. Imported here: langchain_neo4j is slow to import
+    from langchain_neo4j import Neo4jGraph
     try:
-        return Neo4jGraph(
+        graph = Neo4jGraph(
             url=os.getenv("NEO4J_URI"),
             username=os.getenv("NEO4J_USERNAME"),
             password=os.getenv("NEO4J_PASSWORD"),
             database=os.getenv("NEO4J_DATABASE", "neo4j"),
+            timeout=QUERY_TIMEOUT,
+            refresh_schema=False,
+            driver_config={"max_connection_pool_size": 1},
         )
     except Exception as e:
         print(f"Failed to connect to Neo4j: {e}")
         return None
+    graph._driver.close()
+    graph._driver = driver
+    return graph
+
+_query_executor = None
+_offload_executor = None
+_executor_lock = threading.Lock()
+
+def get_query_executor():
+    global _query_executor
+    with _executor_lock:
+        if _query_executor is None:
+            _query_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("NEO4J_QUERY_WORKERS", "4")),
+                thread_name_prefix="neo4j-query",
+            )
+    return _query_executor
+
+def get_offload_executor():
+    # Kept separate from the query executor: offloaded service calls may
+    # themselves fan out with query_concurrently.
+    global _offload_executor
+    with _executor_lock:
+        if _offload_executor is None:
+            _offload_executor = ThreadPoolExecutor(
+                max_workers=POOL_SIZE,
+                thread_name_prefix="neo4j-offload",
+            )
+    return _offload_executor
+
+async def run_in_db_pool(func, *args, timeout=None, **kwargs):
+    """
+    Run a blocking (Neo4j-bound) function on the bounded offload pool so it
+    does not block the event loop. Raises asyncio.TimeoutError after
+    `timeout` seconds (default NEO4J_QUERY_TIMEOUT); the server-side
+    transaction timeout stops the query itself.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_offload_executor(), functools.partial(func, *args, **kwargs))
+    return await asyncio.wait_for(future, timeout or QUERY_TIMEOUT)
 
 class Neo4jService:
     _instance = None
-    
+    _lock = threading.Lock()
+
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Neo4jService, cls).__new__(cls)
-            cls._instance.graph = get_graph_connection()
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(Neo4jService, cls).__new__(cls)
+                cls._instance.driver = get_driver()
+                cls._instance.database = os.getenv("NEO4J_DATABASE", "neo4j")
+                cls._instance._graph = None
         return cls._instance
 
-    def query(self, query, params=None):
-        if self.graph:
-            return self.graph.query(query, params)
-        return []
+    @property
+    def graph(self):
+        """Neo4jGraph for langchain components, built on first use; None without a database."""
+        if self._graph is None and self.driver is not None:
+            with self._lock:
+                if self._graph is None:
+                    self._graph = get_graph_connection(self.driver)
+        return self._graph
+
+    def query(self, query, params=None, timeout=None, max_rows=None):
+        # Every transaction gets its own timeout (default NEO4J_QUERY_TIMEOUT).
+        # Records beyond `max_rows` are discarded instead of streamed.
+        if not self.driver:
+            return []
+        from neo4j import Query
+        with self.driver.session(database=self.database) as session:
+            result = session.run(Query(query, timeout=timeout or QUERY_TIMEOUT), params or {})
+            records = result.fetch(max_rows) if max_rows is not None else result
+            return [record.data() for record in records]
+
+    def explain(self, query, params=None):
+        """Plan a query without running it; returns the driver's ResultSummary."""
+        with self.driver.session(database=self.database) as session:
+            return session.run(f"EXPLAIN {query}", params or {}).consume()
+
+    def query_concurrently(self, *queries):
+        """Run several (query, params) pairs in parallel on the shared driver; results keep their order."""
+        executor = get_query_executor()
+        futures = [executor.submit(self.query, query, params) for query, params in queries]
+        return [future.result() for future in futures]
 
 def get_neo4j_service():
     return Neo4jService()
@@ -0,0 +1,162 @@
+import re
+import threading
+
+from .recipe_queries import get_cached_filter_options, search_recipes
+from .ingredient_lexicon import SYNONYM_MAP, normalize
+
+# Words that may appear in a purely structured request ("geef 5 Thaise
+# recepten met kip"). Any other word means the question is open-ended and
+# goes to the agent; so does 'of'/'or', as search filters only combine
+# with AND.
+FILLER_WORDS = {
+    "geef", "toon", "laat", "zien", "zoek", "vind", "noem", "heb", "hebben", "heeft",
+    "ik", "me", "mij", "je", "jij", "u", "wil", "wilt", "graag", "kun", "kan", "kunt",
+    "er", "een", "paar", "enkele", "wat", "welke", "alle", "lijst", "aantal",
+    "de", "het", "van", "uit", "met", "en", "voor", "in", "op",
+    "keuken", "keukens", "regio", "streek",
+    "please", "give", "show", "me", "some", "with", "and", "from",
+}
+INTENT_WORDS = {"recept", "recepten", "gerecht", "gerechten", "recipe", "recipes", "dish", "dishes"}
+NUMBER_WORDS = {
+    "een": 1, "twee": 2, "drie": 3, "vier": 4, "vijf": 5, "zes": 6, "zeven": 7,
+    "acht": 8, "negen": 9, "tien": 10,
+}
+
+# Dutch ways of naming a cuisine, mapped to the names it may have in the
+# graph; whichever exists in the country vocabulary is used.
+CUISINE_ALIASES = {
+    ("indonesisch", "indonesische", "indonesië", "indonesie"): ("indonesian", "indonesia", "indonesië", "indonesisch"),
+    ("thais", "thaise", "thailand"): ("thai", "thailand"),
+    ("chinees", "chinese", "china"): ("chinese", "china"),
+    ("filipijns", "filipijnse", "filipijnen"): ("filipino", "philippines", "filipijnen"),
+    ("koreaans", "koreaanse", "korea"): ("korean", "korea"),
+    ("japans", "japanse", "japan"): ("japanese", "japan"),
+    ("vietnamees", "vietnamese", "vietnam"): ("vietnamese", "vietnam"),
+    ("maleisisch", "maleisische", "maleisië", "maleisie"): ("malaysian", "malaysia", "maleisië"),
+    ("indiaas", "indiase", "india"): ("indian", "india"),
+}
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+MAX_TERM_WORDS = 4
+
+# Filter vocabularies, named like the search parameters; the order decides
+# which facet wins when a term is in several. 'met kip' means any recipe
+# with chicken, so an ingredient label beats the same main ingredient.
+FACETS = ("countries", "regions", "methods", "ingredients", "main_ingredients")
+
+
+def _tokenize(text):
+    return re.findall(r"[\w\-]+", normalize(text))
+
+
+class QueryRouter:
+    """
+    Recognizes chat questions that are nothing more than a recipe filter
+    (cuisine, region, method, ingredients and an optional count) using the
+    known vocabularies, so they can be answered from the search index
+    without the LLM agent.
+    """
+
+    def __init__(self, options):
+        self.terms = {}  # normalized phrase -> (facet, value)
+        for facet in reversed(FACETS):
+            for value in options.get(facet) or []:
+                if value:
+                    self.terms[normalize(value)] = (facet, value)
+
+        countries = {normalize(c): c for c in options.get("countries") or [] if c}
+        for aliases, candidates in CUISINE_ALIASES.items():
+            match = next((countries[c] for c in candidates if c in countries), None)
+            if match is not None:
+                for alias in aliases:
+                    self.terms.setdefault(alias, ("countries", match))
+
+        for alias, label in SYNONYM_MAP.items():
+            target = self.terms.get(normalize(label))
+            if target is not None:
+                self.terms.setdefault(normalize(alias), target)
+
+    def parse(self, question):
+        """Returns search parameters for a structured question, or None."""
+        tokens = _tokenize(question)
+        params = {}
+        limit = None
+        has_intent = False
+        i = 0
+        while i < len(tokens):
+            for size in range(min(MAX_TERM_WORDS, len(tokens) - i), 0, -1):
+                phrase = " ".join(tokens[i:i + size])
+                if phrase in self.terms:
+                    facet, value = self.terms[phrase]
+                    values = params.setdefault(facet, [])
+                    if value not in values:
+                        values.append(value)
+                    i += size
+                    break
+            else:
+                token = tokens[i]
+                if token.isdigit() and limit is None:
+                    limit = int(token)
+                elif token in NUMBER_WORDS and token != "een" and limit is None:
+                    limit = NUMBER_WORDS[token]
+                elif token in INTENT_WORDS:
+                    has_intent = True
+                elif token not in FILLER_WORDS:
+                    return None
+                i += 1
+
+        if not has_intent or not params:
+            return None
+        params["limit"] = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+        return params
+
+
+_router = None
+_router_options = None
+_router_lock = threading.Lock()
+
+
+def get_query_router():
+    # Rebuilt whenever the filter vocabularies were rebuilt for a new data version
+    global _router, _router_options
+    _, options = get_cached_filter_options()
+    with _router_lock:
+        if _router is None or _router_options is not options:
+            _router = QueryRouter(options)
+            _router_options = options
+        return _router
+
+
+def _describe(params):
+    parts = []
+    for facet, label in (("countries", "keuken"), ("regions", "regio"), ("methods", "bereiding"),
+                         ("main_ingredients", "hoofdingrediënt"), ("ingredients", "ingrediënten")):
+        if params.get(facet):
+            parts.append(f"{label}: {', '.join(params[facet])}")
+    return "; ".join(parts)
+
+
+def route_query(question):
+    """
+    Answer a purely structured recipe question straight from the search
+    index. Returns the answer text, or None when the question should go to
+    the agent (open-ended, or nothing matched).
+    """
+    try:
+        params = get_query_router().parse(question)
+    except Exception as e:
+        print(f"Error routing chat question: {e}")
+        return None
+    if params is None:
+        return None
+
+    recipes, total = search_recipes(**params)
+    if not recipes:
+        return None
+
+    lines = [f"Ik vond {total} recepten ({_describe(params)}). Hier zijn er {len(recipes)}:"]
+    for recipe in recipes:
+        details = ", ".join(recipe.get("countries") or [])
+        lines.append(f"- {recipe['name']}" + (f" ({details})" if details else ""))
+    return "\n".join(lines)
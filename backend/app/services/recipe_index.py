@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from .neo4j import get_neo4j_service
+from .data_version import register_rebuild
+
+# Facets that /api/recipes can filter on. Values inside one facet are OR-ed,
+# except for ingredients where every selected ingredient must be present.
+FACETS = ("countries", "regions", "methods", "main_ingredients", "ingredients")
+
+# Pattern comprehensions keep this one row per recipe (no cartesian product
+# between the facets), so the whole catalogue loads in a single pass.
+FACET_QUERY = """
+MATCH (r:schema__Recipe)
+RETURN r.uri AS id,
+       r.schema__name AS name,
+       [(r)-[:schema__recipeCuisine]->(c:schema__DefinedTerm) | c.schema__name] AS countries,
+       [(r)-[:kb__hasCuisineRegion]->(rg) | coalesce(rg.rdfs__label, last(split(rg.uri, '/')))] AS regions,
+       [(r)-[:kb__usesCookingMethod]->(m:schema__DefinedTerm) | m.schema__name] AS methods,
+       [(r)-[:kb__hasPrimaryIngredient]->(mi:schema__DefinedTerm) | mi.schema__name] AS main_ingredients,
+       [(r)-[:kb__hasIngredientUsage]->(:kb__IngredientUsage)-[:kb__ingredient]->(i:kb__Ingredient) | i.rdfs__label] AS ingredients
+"""
+
+
+def _sort_key(row):
+    # Same order as `ORDER BY r.schema__name, r.uri` (nulls last)
+    return _key(row.get("name"), row.get("id"))
+
+
+def _key(name, uri):
+    return (name is None, name or "", uri or "")
+
+
+def _iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class RecipeIndex:
+    """
+    Recipe-id bitsets per facet value.
+
+    Every recipe gets an ordinal in name order, so a search is a handful of
+    integer AND/OR operations and the set bits of the result are already in
+    the order the listing is displayed in.
+    """
+
+    def __init__(self, rows):
+        rows = sorted((r for r in rows if r.get("id")), key=_sort_key)
+        self.ids = [r["id"] for r in rows]
+        self.names = [r.get("name") for r in rows]
+        self.sort_keys = [_sort_key(r) for r in rows]
+        self.all_bits = (1 << len(self.ids)) - 1
+        self.facets = {facet: {} for facet in FACETS}
+        self.built_at = time.time()
+
+        for ordinal, row in enumerate(rows):
+            bit = 1 << ordinal
+            for facet in FACETS:
+                values = self.facets[facet]
+                for value in set(row.get(facet) or []):
+                    if value is None:
+                        continue
+                    values[value] = values.get(value, 0) | bit
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _any_of(self, facet, values):
+        bits = 0
+        lookup = self.facets[facet]
+        for value in values:
+            bits |= lookup.get(value, 0)
+        return bits
+
+    def match(self, countries=None, regions=None, methods=None, ingredients=None, main_ingredients=None):
+        bits = self.all_bits
+        if countries:
+            bits &= self._any_of("countries", countries)
+        if regions:
+            bits &= self._any_of("regions", regions)
+        if methods:
+            bits &= self._any_of("methods", methods)
+        if main_ingredients:
+            bits &= self._any_of("main_ingredients", main_ingredients)
+        for ingredient in ingredients or []:
+            bits &= self.facets["ingredients"].get(ingredient, 0)
+        return bits
+
+    def position_after(self, name, uri):
+        """Ordinal of the first recipe that sorts after (name, uri)."""
+        return bisect_right(self.sort_keys, _key(name, uri))
+
+    def page_ordinals(self, bits, skip=0, limit=24):
+        ordinals = []
+        for position, ordinal in enumerate(_iter_bits(bits)):
+            if position < skip:
+                continue
+            if len(ordinals) >= limit:
+                break
+            ordinals.append(ordinal)
+        return ordinals
+
+    def sort_key_of(self, ordinal):
+        """(name, uri) of a recipe, as used by keyset cursors."""
+        return self.names[ordinal], self.ids[ordinal]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_enabled():
+    return os.getenv("RECIPE_INDEX_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+def get_recipe_index():
+    return _index
+
+
+def build_recipe_index():
+    neo4j = get_neo4j_service()
+    rows = neo4j.query(FACET_QUERY)
+    return RecipeIndex(rows)
+
+
+def refresh_recipe_index():
+    """(Re)load the facet index from Neo4j and swap it in atomically."""
+    global _index
+    if not index_enabled():
+        return None
+
+    with _index_lock:
+        start = time.perf_counter()
+        try:
+            index = build_recipe_index()
+        except Exception as e:
+            print(f"Error building recipe index: {e}")
+            return _index
+        if not len(index):
+            # No data (or no connection): keep serving from Cypher
+            print("Recipe index is empty, falling back to Cypher search")
+            return _index
+        _index = index
+        print(f"Recipe index loaded: {len(index)} recipes in {time.perf_counter() - start:.2f}s")
+        return _index
+
+
+register_rebuild("recipe_index", refresh_recipe_index)
@@ -1,11 +1,145 @@
+import base64
+import json
+import os
+import threading
+from collections import OrderedDict
+
 from .neo4j import get_neo4j_service
+from .data_version import get_data_version, register_rebuild
+from .recipe_index import get_recipe_index
 
-def search_recipes(countries=None, regions=None, methods=None, ingredients=None, limit=24, skip=0, **kwargs):
+SEARCH_MODES = ("single", "concurrent", "sequential")
+
+# Card metadata for a recipe listing, shared by the Cypher search and the
+# batched hydration of facet-index results. Expects `r` to be bound.
+RECIPE_SUMMARY_PROJECTION = """
+    OPTIONAL MATCH (r)-[:kb__hasPrimaryIngredient]->(mi:schema__DefinedTerm)
+    OPTIONAL MATCH (r)-[:schema__recipeCuisine]->(c:schema__DefinedTerm)
+    OPTIONAL MATCH (r)-[:kb__hasCuisineRegion]->(rg)
+    OPTIONAL MATCH (r)-[:kb__usesCookingMethod]->(m:schema__DefinedTerm)
+    WITH r,
+         collect(DISTINCT mi.schema__name) as mis,
+         collect(DISTINCT c.schema__name) as cs,
+         collect(DISTINCT coalesce(rg.rdfs__label, last(split(rg.uri, '/')))) as rs,
+         collect(DISTINCT m.schema__name) as ms
+    RETURN r {
+      id: r.uri,
+      name: r.schema__name,
+      image: r.schema__image,
+      yield: r.schema__recipeYield,
+      instructions: r.schema__recipeInstructions,
+      description: r.description,
+      mainIngredient: head(mis),
+      countries: cs,
+      regions: rs,
+      methods: ms
+    } AS recipe
+"""
+
+# Same fields as a map projection with pattern comprehensions, for queries
+# that cannot aggregate per recipe (e.g. the single-round-trip search).
+RECIPE_SUMMARY_MAP = """{
+      id: r.uri,
+      name: r.schema__name,
+      image: r.schema__image,
+      yield: r.schema__recipeYield,
+      instructions: r.schema__recipeInstructions,
+      description: r.description,
+      mainIngredient: head([(r)-[:kb__hasPrimaryIngredient]->(mi:schema__DefinedTerm) | mi.schema__name]),
+      countries: [(r)-[:schema__recipeCuisine]->(c:schema__DefinedTerm) | c.schema__name],
+      regions: [(r)-[:kb__hasCuisineRegion]->(rg) | coalesce(rg.rdfs__label, last(split(rg.uri, '/')))],
+      methods: [(r)-[:kb__usesCookingMethod]->(m:schema__DefinedTerm) | m.schema__name]
+    }"""
+
+def hydrate_recipes(recipe_ids):
+    """Fetch listing metadata for a page of recipe ids in one query, keeping their order."""
+    if not recipe_ids:
+        return []
     neo4j = get_neo4j_service()
-    
+    query = """
+    UNWIND $ids AS id
+    MATCH (r:schema__Recipe {uri: id})
+    WITH DISTINCT r
+    """ + RECIPE_SUMMARY_PROJECTION
+    results = neo4j.query(query, {"ids": list(recipe_ids)})
+    by_id = {r['recipe']['id']: r['recipe'] for r in results}
+    return [by_id[i] for i in recipe_ids if i in by_id]
+
+def encode_cursor(key):
+    """Opaque keyset cursor pointing just after the (name, uri) `key`."""
+    raw = json.dumps(list(key)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Returns (name, uri); raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, uri = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(uri, str) or not (name is None or isinstance(name, str)):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return name, uri
+
+# Keyset seeks in `ORDER BY r.schema__name, r.uri` order, where recipes
+# without a name sort last. Named and unnamed recipes are paged as separate
+# ranges, so each seek is a plain range the planner can take from an index.
+NAMED_SEEK = "r.schema__name >= $after_name AND (r.schema__name > $after_name OR r.uri > $after_uri)"
+UNNAMED_SEEK = "r.schema__name IS NULL AND r.uri > $after_uri"
+
+def _seek_pattern(match_cypher, seek):
+    # The seek goes on the (r:schema__Recipe) MATCH itself, ahead of the
+    # filter patterns, rather than on the WHERE of the last MATCH
+    first, _, rest = match_cypher.partition(" MATCH ")
+    return f"{first} WHERE {seek}" + (f" MATCH {rest}" if rest else "")
+
+def _next_key(keys, limit):
+    # Taken from the page query itself, so recipes dropped later (hydration
+    # of a node deleted since the index was built) cannot move the cursor
+    return keys[-1] if keys and len(keys) >= limit else None
+
+# Match counts per filter set, so cursor pages after the first do not
+# recount everything; entries are tagged with the data version
+COUNT_CACHE_SIZE = 256
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+def _cached_count(key):
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry is None or entry[0] != get_data_version():
+            return None
+        _count_cache.move_to_end(key)
+        return entry[1]
+
+def _store_count(key, total):
+    with _count_cache_lock:
+        _count_cache[key] = (get_data_version(), total)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
+def _search_with_index(index, countries, regions, methods, ingredients, main_ingredients, limit, skip, after=None):
+    bits = index.match(
+        countries=countries,
+        regions=regions,
+        methods=methods,
+        ingredients=ingredients,
+        main_ingredients=main_ingredients,
+    )
+    total = bits.bit_count()
+    if after is not None:
+        # Drop every recipe up to and including the cursor position
+        bits &= ~((1 << index.position_after(*after)) - 1)
+        skip = 0
+    ordinals = index.page_ordinals(bits, skip=skip, limit=limit)
+    recipes = hydrate_recipes([index.ids[o] for o in ordinals])
+    return recipes, total, _next_key([index.sort_key_of(o) for o in ordinals], limit)
+
+def _build_search_pattern(countries=None, regions=None, methods=None, ingredients=None, main_ingredients=None):
     match_parts = ["(r:schema__Recipe)"]
     where_clauses = []
-    params = {"limit": limit, "skip": skip}
+    params = {}
     
     if countries:
         match_parts.append("(r)-[:schema__recipeCuisine]->(c:schema__DefinedTerm)")
@@ -28,14 +162,46 @@ def search_recipes(countries=None, regions=None, methods=None, ingredients=None,
             where_clauses.append(f"i{i}.rdfs__label = $ingredient_{i}")
             params[f"ingredient_{i}"] = ingredient
         
-    if kwargs.get('main_ingredients'):
+    if main_ingredients:
         match_parts.append("(r)-[:kb__hasPrimaryIngredient]->(mi:schema__DefinedTerm)")
         where_clauses.append("mi.schema__name IN $main_ingredients")
-        params["main_ingredients"] = tuple(kwargs.get('main_ingredients'))
+        params["main_ingredients"] = tuple(main_ingredients)
 
     match_cypher = " MATCH ".join(match_parts)
     where_cypher = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    return match_cypher, where_cypher, params
 
+def _dedupe_recipe_lists(recipe):
+    # Pattern comprehensions have no DISTINCT, unlike collect(DISTINCT ...)
+    for key in ("countries", "regions", "methods"):
+        if recipe.get(key):
+            recipe[key] = list(dict.fromkeys(recipe[key]))
+    return recipe
+
+def _search_single_query(neo4j, match_cypher, where_cypher, params):
+    # Total and page in one round trip: collect the ordered matches once,
+    # then slice. The [null] row keeps `total` when the page is empty.
+    query = f"""
+    MATCH {match_cypher}
+    {where_cypher}
+    WITH DISTINCT r
+    ORDER BY r.schema__name, r.uri
+    WITH collect(r) AS matches
+    WITH size(matches) AS total, matches[$skip..($skip + $limit)] AS page
+    UNWIND CASE WHEN size(page) = 0 THEN [null] ELSE page END AS r
+    RETURN total,
+           CASE WHEN r IS NULL THEN null ELSE r {RECIPE_SUMMARY_MAP} END AS recipe
+    """
+    results = neo4j.query(query, params)
+    total = results[0]['total'] if results else 0
+    recipes = [_dedupe_recipe_lists(r['recipe']) for r in results if r['recipe'] is not None]
+    return recipes, total
+
+def _search_two_queries(neo4j, match_cypher, where_cypher, params, concurrent, page_match=None, total=None):
+    """
+    Count and page as separate queries. `page_match` replaces the MATCH of
+    the page query only (the keyset seek); a known `total` skips the count.
+    """
     count_query = f"""
     MATCH {match_cypher}
     {where_cypher}
@@ -43,45 +209,117 @@ def search_recipes(countries=None, regions=None, methods=None, ingredients=None,
     """
     
     data_query = f"""
-    MATCH {match_cypher}
+    MATCH {page_match or match_cypher}
     {where_cypher}
     WITH DISTINCT r
-    ORDER BY r.schema__name
+    ORDER BY r.schema__name, r.uri
     SKIP $skip LIMIT $limit
-    OPTIONAL MATCH (r)-[:kb__hasPrimaryIngredient]->(mi:schema__DefinedTerm)
-    OPTIONAL MATCH (r)-[:schema__recipeCuisine]->(c:schema__DefinedTerm)
-    OPTIONAL MATCH (r)-[:kb__hasCuisineRegion]->(rg)
-    OPTIONAL MATCH (r)-[:kb__usesCookingMethod]->(m:schema__DefinedTerm)
-    WITH r,
-         collect(DISTINCT mi.schema__name) as mis,
-         collect(DISTINCT c.schema__name) as cs,
-         collect(DISTINCT coalesce(rg.rdfs__label, last(split(rg.uri, '/')))) as rs,
-         collect(DISTINCT m.schema__name) as ms
-    RETURN r {{
-      id: r.uri,
-      name: r.schema__name,
-      image: r.schema__image,
-      yield: r.schema__recipeYield,
-      instructions: r.schema__recipeInstructions,
-      description: r.description,
-      mainIngredient: head(mis),
-      countries: cs,
-      regions: rs,
-      methods: ms
-    }} AS recipe
+    """ + RECIPE_SUMMARY_PROJECTION
+
+    if total is not None:
+        results = neo4j.query(data_query, params)
+    elif concurrent:
+        total_res, results = neo4j.query_concurrently(
+            (count_query, params),
+            (data_query, params),
+        )
+        total = total_res[0]['total'] if total_res else 0
+    else:
+        total_res = neo4j.query(count_query, params)
+        results = neo4j.query(data_query, params)
+        total = total_res[0]['total'] if total_res else 0
+
+    recipes = [r['recipe'] for r in results]
+    return recipes, total
+
+def _search_keyset(neo4j, match_cypher, where_cypher, params, after, total=None):
+    """
+    Page past the (name, uri) cursor `after`: named recipes first and, once
+    they run out, the unnamed ones that sort after them.
     """
+    name, uri = after
+    recipes = []
+    if name is not None:
+        recipes, total = _search_two_queries(
+            neo4j, match_cypher, where_cypher, dict(params, after_name=name, after_uri=uri),
+            concurrent=True, page_match=_seek_pattern(match_cypher, NAMED_SEEK), total=total
+        )
+        uri = ""
+    if len(recipes) < params["limit"]:
+        unnamed, total = _search_two_queries(
+            neo4j, match_cypher, where_cypher,
+            dict(params, after_uri=uri, limit=params["limit"] - len(recipes)),
+            concurrent=True, page_match=_seek_pattern(match_cypher, UNNAMED_SEEK), total=total
+        )
+        recipes += unnamed
+    return recipes, total
+
+def get_search_mode(mode=None):
+    mode = (mode or os.getenv("RECIPE_SEARCH_MODE", "single")).lower()
+    return mode if mode in SEARCH_MODES else "single"
+
+def search_recipes_with_mode(countries=None, regions=None, methods=None, ingredients=None, limit=24, skip=0, mode=None, after=None, **kwargs):
+    """
+    Like search_recipes, but also returns how the result was produced:
+    "index" (in-memory facet index), "single" (count and page in one Cypher
+    query), "concurrent" (both queries in parallel), "sequential" or
+    "keyset" (page seeks past the `after` cursor, a (name, uri) pair from
+    decode_cursor, instead of skipping). The fourth value is the (name, uri)
+    to pass to encode_cursor for the next page, or None after the last one.
+    """
+    main_ingredients = kwargs.get('main_ingredients')
+
+    index = get_recipe_index()
+    if index is not None:
+        try:
+            recipes, total, next_key = _search_with_index(
+                index, countries, regions, methods, ingredients,
+                main_ingredients, limit, skip, after
+            )
+            return recipes, total, "index", next_key
+        except Exception as e:
+            print(f"Error searching recipe index, falling back to Cypher: {e}")
+
+    neo4j = get_neo4j_service()
+    mode = get_search_mode(mode)
+    match_cypher, where_cypher, params = _build_search_pattern(
+        countries, regions, methods, ingredients, main_ingredients
+    )
+    count_key = (match_cypher, where_cypher, tuple(sorted(params.items())))
+    params.update({"limit": limit, "skip": skip})
     
     try:
-        total_res = neo4j.query(count_query, params)
-        total = total_res[0]['total'] if total_res else 0
-        
-        results = neo4j.query(data_query, params)
-        recipes = [r['recipe'] for r in results]
-        
-        return recipes, total
+        if after is not None:
+            # Collecting all matches (single mode) would defeat the seek; the
+            # count is usually known from page 1
+            mode = "keyset"
+            params["skip"] = 0
+            recipes, total = _search_keyset(
+                neo4j, match_cypher, where_cypher, params, after, total=_cached_count(count_key)
+            )
+        elif mode == "single":
+            recipes, total = _search_single_query(neo4j, match_cypher, where_cypher, params)
+        else:
+            recipes, total = _search_two_queries(
+                neo4j, match_cypher, where_cypher, params, concurrent=(mode == "concurrent")
+            )
+        _store_count(count_key, total)
+        return recipes, total, mode, _next_key([(r['name'], r['id']) for r in recipes], limit)
     except Exception as e:
         print(f"Error searching recipes: {e}")
-        return [], 0
+        return [], 0, mode, None
+
+def search_recipes(countries=None, regions=None, methods=None, ingredients=None, limit=24, skip=0, **kwargs):
+    recipes, total, _, _ = search_recipes_with_mode(
+        countries=countries,
+        regions=regions,
+        methods=methods,
+        ingredients=ingredients,
+        limit=limit,
+        skip=skip,
+        **kwargs
+    )
+    return recipes, total
 
 def get_recipe_details(recipe_id):
     neo4j = get_neo4j_service()
@@ -126,15 +364,8 @@ def get_recipe_details(recipe_id):
         print(f"Error getting recipe details: {e}")
         return None
 
-def get_related_recipes(recipe_id, limit=6):
-    neo4j = get_neo4j_service()
-    
-    query = """
-    MATCH (source:schema__Recipe {uri: $id})
-    WHERE source.hasVectorEmbedding IS NOT NULL
-    CALL db.index.vector.queryNodes('recipes', $limit + 1, source.hasVectorEmbedding) 
-    YIELD node AS candidate, score
-    WHERE candidate.uri <> $id
+# Shared tail of the related-recipes queries; expects `candidate` and `score`.
+RELATED_RECIPE_PROJECTION = """
     OPTIONAL MATCH (candidate)-[:kb__hasPrimaryIngredient]->(mi:schema__DefinedTerm)
     OPTIONAL MATCH (candidate)-[:schema__recipeCuisine]->(c:schema__DefinedTerm)
     OPTIONAL MATCH (candidate)-[:kb__hasCuisineRegion]->(rg)
@@ -154,10 +385,37 @@ def get_related_recipes(recipe_id, limit=6):
         regions: regions,
         methods: methods
     } AS recipe, score AS similarity
-    """
+    ORDER BY similarity DESC
+"""
+
+def get_related_recipes(recipe_id, limit=6):
+    neo4j = get_neo4j_service()
+    
+    # Neighbours precomputed by tools/precompute_related_recipes.py
+    precomputed_query = """
+    MATCH (:schema__Recipe {uri: $id})-[s:kb__similarTo]->(candidate:schema__Recipe)
+    WITH candidate, s.score AS score
+    ORDER BY score DESC
+    LIMIT $limit
+    """ + RELATED_RECIPE_PROJECTION
+
+    # Fallback for recipes without precomputed neighbours
+    vector_query = """
+    MATCH (source:schema__Recipe {uri: $id})
+    WHERE source.hasVectorEmbedding IS NOT NULL
+    CALL db.index.vector.queryNodes('recipes', $limit + 1, source.hasVectorEmbedding) 
+    YIELD node AS candidate, score
+    WHERE candidate.uri <> $id
+    WITH candidate, score
+    ORDER BY score DESC
+    LIMIT $limit
+    """ + RELATED_RECIPE_PROJECTION
     
     try:
-        results = neo4j.query(query, {"id": recipe_id, "limit": limit})
+        params = {"id": recipe_id, "limit": limit}
+        results = neo4j.query(precomputed_query, params)
+        if not results:
+            results = neo4j.query(vector_query, params)
         for r in results:
             r['sharedIngredients'] = f"{int(r['similarity'] * 100)}% match" 
         return results
@@ -193,3 +451,40 @@ def get_all_main_ingredients():
     RETURN DISTINCT m.schema__name AS name ORDER BY name
     """
     return [r['name'] for r in neo4j.query(query)]
+
+def get_filter_options():
+    return {
+        "countries": get_all_countries(),
+        "regions": get_all_regions(),
+        "methods": get_all_methods(),
+        "ingredients": get_all_ingredients(),
+        "main_ingredients": get_all_main_ingredients()
+    }
+
+# Filter vocabularies only change when the TTL is re-imported, so they are
+# built once per data version instead of five label scans per page load.
+_filter_cache = {"version": None, "options": None}
+_filter_cache_lock = threading.Lock()
+
+def rebuild_filter_options():
+    options = get_filter_options()
+    if not any(options.values()):
+        # Without a database every list comes back empty; serve that, but
+        # do not keep it until the next data version
+        return options
+    with _filter_cache_lock:
+        _filter_cache["version"] = get_data_version()
+        _filter_cache["options"] = options
+    return options
+
+def get_cached_filter_options():
+    """Returns (data_version, options), building the cache on first use."""
+    with _filter_cache_lock:
+        options = _filter_cache["options"]
+        version = _filter_cache["version"]
+    if options is None:
+        options = rebuild_filter_options()
+        version = _filter_cache["version"]
+    return version, options
+
+register_rebuild("filters", rebuild_filter_options)
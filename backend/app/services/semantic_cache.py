@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .data_version import register_rebuild
+
+
+def _normalize_text(text):
+    return " ".join(text.casefold().split())
+
+
+class SemanticCache:
+    """
+    Final chat answers keyed on the question embedding.
+
+    A lookup hits when a stored question is identical (after normalizing
+    whitespace and case) or its embedding has a cosine similarity of at least
+    `threshold`. Entries expire after `ttl` seconds; beyond `max_entries` the
+    least recently used entry is evicted.
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600, max_entries=512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # normalized question -> (unit vector, answer, created_at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        expired = [key for key, (_, _, created) in self._entries.items() if now - created > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, question, embedding):
+        key = _normalize_text(question)
+        vector = _unit(embedding)
+        with self._lock:
+            self._expire(time.time())
+            if key not in self._entries and self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[k][0] for k in keys])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                key = keys[best] if scores[best] >= self.threshold else None
+
+            if key is None or key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][1]
+
+    def store(self, question, embedding, answer):
+        key = _normalize_text(question)
+        with self._lock:
+            self._entries[key] = (_unit(embedding), answer, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        return self
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "max_entries": self.max_entries,
+            }
+
+
+def _unit(embedding):
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def cache_enabled():
+    return os.getenv("CHAT_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+_cache = SemanticCache(
+    threshold=float(os.getenv("CHAT_CACHE_THRESHOLD", "0.95")),
+    ttl=float(os.getenv("CHAT_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("CHAT_CACHE_SIZE", "512")),
+)
+
+
+def get_semantic_cache():
+    return _cache
+
+
+# Answers quote recipe data; drop them when the graph is re-imported
+register_rebuild("chat_cache", _cache.clear)
@@ -1,14 +1,18 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
 from ..llm import get_llm  
+from ..registry import get_or_create
 from ..services.neo4j import get_neo4j_service
-from langchain_neo4j import GraphCypherQAChain
-from langchain.prompts.prompt import PromptTemplate
+from ..services.data_version import register_rebuild
 
-def cypher_qa(input_question):
-    neo4j_service = get_neo4j_service()
-    if not neo4j_service.graph:
-        return "Sorry, I cannot connect to the database right now."
+# Budget for running generated Cypher
+CYPHER_TIMEOUT = float(os.getenv("CYPHER_QA_TIMEOUT", "10"))
+CYPHER_MAX_ROWS = int(os.getenv("CYPHER_QA_MAX_ROWS", "100"))
 
-    CYPHER_GENERATION_TEMPLATE = """
+CYPHER_GENERATION_TEMPLATE = """
     You are an expert Neo4j Developer translating user questions into Cypher to answer questions about recipes and provide recommendations.
     Convert the user's question based on the schema.
 
@@ -41,18 +45,171 @@ def cypher_qa(input_question):
     Cypher Query:
     """
 
+class CypherValidationError(ValueError):
+    pass
+
+
+class CypherCache:
+    """
+    Validated Cypher per normalized question, least recently used evicted
+    beyond `max_entries`. Questions that only differ in their numbers
+    ("3 Thaise recepten" / "5 Thaise recepten") share one entry when the
+    numbers could be turned into query parameters.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # question key -> cypher
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, *keys):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return key, self._entries[key]
+            self.misses += 1
+            return None, None
+
+    def store(self, key, cypher):
+        with self._lock:
+            self._entries[key] = cypher
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        return self
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cypher_cache = CypherCache(int(os.getenv("CYPHER_CACHE_SIZE", "256")))
+
+def get_cypher_cache():
+    return _cypher_cache
+
+# Cached queries are only known to be valid against the current graph
+register_rebuild("cypher_cache", _cypher_cache.clear)
+
+
+def question_keys(question):
+    """Returns (exact key, templated key, numbers) for a question."""
+    exact = " ".join(question.casefold().split()).rstrip("?!. ")
+    numbers = [int(n) for n in re.findall(r"\d+", exact)]
+    return exact, "template:" + re.sub(r"\d+", "#", exact), numbers
+
+def number_params(numbers):
+    return {f"n{i}": n for i, n in enumerate(numbers)}
+
+def parameterize(cypher, numbers):
+    """
+    Replace `LIMIT <n>` for numbers taken from the question with `$n<i>`.
+    Returns None unless every question number became a parameter and none
+    is left anywhere else, even inside a token such as duration('PT30M'),
+    since the query then cannot be reused for other numbers.
+    """
+    positions = {}
+    for i, n in enumerate(numbers):
+        positions.setdefault(n, i)
+
+    def replace(match):
+        n = int(match.group(1))
+        return f"LIMIT $n{positions[n]}" if n in positions else match.group(0)
+
+    templated = re.sub(r"\bLIMIT\s+(\d+)\b", replace, cypher, flags=re.IGNORECASE)
+    if any(not re.search(rf"\$n{i}\b", templated) for i in positions.values()):
+        return None
+    literals = re.sub(r"\$n\d+", "", templated)
+    if any(str(n) in literals for n in positions):
+        return None
+    return templated
+
+def extract_cypher(text):
+    """The query from an LLM reply, without Markdown fences or a 'cypher' tag."""
+    fenced = re.search(r"```(?:cypher)?\s*(.*?)```", text, re.DOTALL | re.IGNORECASE)
+    cypher = fenced.group(1) if fenced else text
+    return cypher.strip().rstrip(";").strip()
+
+# Read-only as far as the planner is concerned, but they fetch URLs, run
+# arbitrary nested queries or open their own write transactions
+FORBIDDEN_CYPHER = re.compile(
+    r"\bLOAD\s+CSV\b|\bIN\s+TRANSACTIONS\b|\bapoc\.(?:load|cypher|import|export|periodic)\.|\bdbms\.",
+    re.IGNORECASE,
+)
+
+def validate_cypher(cypher, params=None):
+    """
+    Plan the query with EXPLAIN: rejects syntax errors, unknown parameters
+    and anything that is not read-only.
+    """
+    forbidden = FORBIDDEN_CYPHER.search(cypher)
+    if forbidden:
+        raise CypherValidationError(f"{forbidden.group(0)!r} is not allowed in generated queries")
+    try:
+        summary = get_neo4j_service().explain(cypher, params)
+    except Exception as e:
+        raise CypherValidationError(f"Invalid Cypher: {e}") from e
+    if summary.query_type != "r":
+        raise CypherValidationError(f"Only read queries are allowed (query type {summary.query_type!r})")
+
+def _create_cypher_generator():
+    from langchain.prompts.prompt import PromptTemplate
+    from langchain.schema import StrOutputParser
+
     cypher_prompt = PromptTemplate.from_template(CYPHER_GENERATION_TEMPLATE)
+    return cypher_prompt | get_llm() | StrOutputParser()
+
+def get_cypher_generator():
+    # Built once per process and shared by every question
+    return get_or_create("cypher_generator", _create_cypher_generator)
+
+def get_cypher(question):
+    """
+    Returns (cypher, params) for a question: from the cache when an
+    equivalent question was seen before, otherwise generated by the LLM,
+    validated and cached.
+    """
+    exact, templated, numbers = question_keys(question)
+    key, cypher = _cypher_cache.get(exact, templated)
+    if cypher is not None:
+        return cypher, number_params(numbers) if key == templated else {}
+
+    cypher = extract_cypher(get_cypher_generator().invoke({"question": question}))
+    validate_cypher(cypher)
+    reusable = parameterize(cypher, numbers) if numbers else None
+    if reusable is not None:
+        params = number_params(numbers)
+        validate_cypher(reusable, params)
+        _cypher_cache.store(templated, reusable)
+        return reusable, params
+    _cypher_cache.store(exact, cypher)
+    return cypher, {}
 
-    # --- Lazy LLM factory gebruiken ---
-    llm_instance = get_llm()
+def cypher_qa(input_question):
+    neo4j_service = get_neo4j_service()
+    if not neo4j_service.driver:
+        return "Sorry, I cannot connect to the database right now."
 
-    chain = GraphCypherQAChain.from_llm(
-        llm_instance,
-        graph=neo4j_service.graph,
-        verbose=True,
-        cypher_prompt=cypher_prompt,
-        allow_dangerous_requests=True,
-        return_direct=True  # Return raw Cypher results
-    )
+    try:
+        cypher, params = get_cypher(input_question)
+    except CypherValidationError as e:
+        print(f"Rejected generated Cypher: {e}")
+        return "Sorry, I could not build a valid query for this question."
 
-    return chain.invoke(input_question)
+    try:
+        rows = neo4j_service.query(cypher, params, timeout=CYPHER_TIMEOUT, max_rows=CYPHER_MAX_ROWS)
+    except Exception as e:
+        print(f"Error running generated Cypher: {e}")
+        return "Sorry, this question took too long to answer from the database."
+    return {"query": input_question, "result": rows}
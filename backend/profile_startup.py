@@ -0,0 +1,59 @@
+"""
+Import-time breakdown of the API, and a startup budget check.
+
+    cd backend
+    python profile_startup.py                    # top packages by import time
+    python profile_startup.py --budget 3         # exit 1 if importing takes longer than 3s
+    python profile_startup.py --module app.services.chat_agent
+
+Runs the import in a fresh interpreter with `-X importtime`. For the raw
+per-module log of a real server start, run it with PYTHONPROFILEIMPORTTIME=1.
+The app itself also profiles its cache warm-up with PROFILE_STARTUP=1, and
+refuses to start when imports plus warm-up exceed STARTUP_BUDGET seconds.
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+
+CHILD = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def profile_import(module):
+    """Returns (wall seconds, {top-level package: self seconds})."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(module=module)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        error = "\n".join(l for l in result.stderr.splitlines() if not l.startswith("import time:"))
+        raise RuntimeError(f"Importing {module} failed:\n{error}")
+
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        packages[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return float(result.stdout.strip().splitlines()[-1]), packages
+
+
+def main():
+    p = argparse.ArgumentParser(description="Show what the API spends its startup imports on")
+    p.add_argument("--module", default="app.main")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--budget", type=float, default=None, help="fail when the import takes longer (seconds)")
+    args = p.parse_args()
+
+    total, packages = profile_import(args.module)
+    print(f"import {args.module}: {total:.2f}s")
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {seconds:7.3f}s  {name}")
+
+    if args.budget is not None and total > args.budget:
+        print(f"Over the startup budget of {args.budget:.2f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
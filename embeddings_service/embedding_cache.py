@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+KEY_BYTES = 16
+
+# Vectors of recently embedded texts kept in memory (0 = off), and optionally
+# a directory for a memory-mapped store of EMBED_CACHE_DISK_SIZE vectors
+CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+CACHE_DISK_SIZE = int(os.getenv("EMBED_CACHE_DISK_SIZE", "100000"))
+
+
+class DiskStore:
+    """
+    Fixed-size ring of (key, vector) rows in memory-mapped files, so cached
+    vectors survive restarts without being loaded into RAM. When the ring is
+    full the oldest row is overwritten. Each row also gets a write sequence
+    number, from which the ring position is recovered on open, so a process
+    that was killed before flush() does not overwrite live rows.
+    """
+
+    def __init__(self, directory, namespace, capacity):
+        self.directory = directory
+        self.namespace = namespace
+        self.capacity = capacity
+        self.keys = None
+        self.vectors = None
+        self.seqs = None
+        self.slots = {}  # key -> row
+        self.next = 0
+        self.seq = 1  # 0 marks an empty row
+        os.makedirs(directory, exist_ok=True)
+
+        meta = self._read_meta()
+        # Vectors from another model, sequence length or size are not reused
+        if (meta and meta["namespace"] == namespace and meta["capacity"] == capacity
+                and os.path.exists(self._path("seqs.u64"))):
+            self._open(meta["dim"], "r+")
+            filled = np.flatnonzero(self.seqs)
+            # Oldest first, so a key is indexed at its newest row
+            for i in filled[np.argsort(self.seqs[filled])]:
+                self.slots[self.keys[i].tobytes()] = int(i)
+            if len(filled):
+                last = int(np.argmax(self.seqs))
+                self.next = (last + 1) % capacity
+                self.seq = int(self.seqs[last]) + 1
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _open(self, dim, mode):
+        self.keys = np.memmap(self._path("keys.bin"), dtype=np.uint8, mode=mode, shape=(self.capacity, KEY_BYTES))
+        self.vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode=mode, shape=(self.capacity, dim))
+        self.seqs = np.memmap(self._path("seqs.u64"), dtype=np.uint64, mode=mode, shape=(self.capacity,))
+
+    def get(self, key):
+        row = self.slots.get(key)
+        return None if row is None else np.array(self.vectors[row])
+
+    def put(self, key, vector):
+        if key in self.slots:
+            return
+        if self.vectors is None:
+            self._open(len(vector), "w+")
+            self.flush()
+        row = self.next
+        old = self.keys[row].tobytes()
+        if self.slots.get(old) == row:
+            del self.slots[old]
+        # The sequence number goes in last: a row without one is ignored on open
+        self.seqs[row] = 0
+        self.keys[row] = np.frombuffer(key, dtype=np.uint8)
+        self.vectors[row] = vector
+        self.seqs[row] = self.seq
+        self.slots[key] = row
+        self.seq += 1
+        self.next = (row + 1) % self.capacity
+
+    def flush(self):
+        if self.vectors is None:
+            return
+        self.keys.flush()
+        self.vectors.flush()
+        self.seqs.flush()
+        meta = {"namespace": self.namespace, "capacity": self.capacity, "dim": self.vectors.shape[1]}
+        with open(self._path("meta.json"), "w") as f:
+            json.dump(meta, f)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embeddings: a 16-byte blake2b of namespace + text maps
+    to its vector. The `max_entries` most recently used vectors are kept in
+    memory; with a `directory`, every vector is also written to a DiskStore
+    that is consulted on a memory miss. Not thread-safe: main.py only uses it
+    from the event loop, inference_server.py behind a lock.
+    """
+
+    def __init__(self, namespace, max_entries=CACHE_SIZE, directory=CACHE_DIR or None, disk_size=CACHE_DISK_SIZE):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._hasher = hashlib.blake2b(namespace.encode("utf-8") + b"\0", digest_size=KEY_BYTES)
+        self._entries = OrderedDict()  # key -> float32 vector
+        self.disk = DiskStore(directory, namespace, disk_size) if directory else None
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self.disk is not None
+
+    def key(self, text):
+        hasher = self._hasher.copy()
+        hasher.update(text.encode("utf-8"))
+        return hasher.digest()
+
+    def get(self, key):
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+        elif self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    def put(self, key, vector):
+        # A copy: rows of a batch result are views that would keep the whole
+        # batch array alive for as long as one of them is cached
+        vector = np.array(vector, dtype=np.float32, copy=True)
+        self._remember(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+
+    def _remember(self, key, vector):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup_many(self, texts):
+        """
+        Returns (keys, vectors, missing): the cached vector or None per text,
+        and the distinct texts that still have to be embedded, by key.
+        """
+        keys = [self.key(t) for t in texts]
+        vectors = [self.get(k) for k in keys]
+        missing = {}
+        for text, key, vector in zip(texts, keys, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        return keys, vectors, missing
+
+    def fill(self, keys, vectors, missing, computed):
+        """Store the vectors computed for `missing` and return all vectors in request order."""
+        if missing:
+            fresh = dict(zip(missing, computed))
+            for key, vector in fresh.items():
+                self.put(key, vector)
+            vectors = [fresh[k] if v is None else v for k, v in zip(keys, vectors)]
+        return np.stack(vectors)
+
+    def flush(self):
+        if self.disk is not None:
+            self.disk.flush()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": sum(v.nbytes for v in self._entries.values()),
+            "disk_entries": len(self.disk) if self.disk is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
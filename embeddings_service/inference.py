@@ -0,0 +1,175 @@
+from typing import List
+import os
+import numpy as np
+
+MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "./model-quant.onnx")
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH", "./tokenizer/tokenizer.json")
+
+# ONNX Runtime settings per deployment size, picked with EMBED_RUNTIME_PROFILE.
+# intra_op_threads 0 lets ONNX Runtime use every core.
+#   low-mem     one thread, no memory arena: fits a 512 MB instance
+#   throughput  all cores per run, full graph optimization, large batches
+#   latency     all cores with spinning threads and small batches for short queues
+RUNTIME_PROFILES = {
+    "low-mem": {
+        "intra_op_threads": 1, "inter_op_threads": 1, "execution_mode": "sequential",
+        "optimization": "basic", "memory_arena": False, "allow_spinning": False,
+        "max_batch_size": 64, "max_wait_ms": 5,
+    },
+    "throughput": {
+        "intra_op_threads": 0, "inter_op_threads": 1, "execution_mode": "sequential",
+        "optimization": "all", "memory_arena": True, "allow_spinning": False,
+        "max_batch_size": 256, "max_wait_ms": 10,
+    },
+    "latency": {
+        "intra_op_threads": 0, "inter_op_threads": 1, "execution_mode": "sequential",
+        "optimization": "all", "memory_arena": True, "allow_spinning": True,
+        "max_batch_size": 16, "max_wait_ms": 1,
+    },
+}
+RUNTIME_PROFILE = os.getenv("EMBED_RUNTIME_PROFILE", "low-mem")
+if RUNTIME_PROFILE not in RUNTIME_PROFILES:
+    raise RuntimeError(f"Unknown EMBED_RUNTIME_PROFILE {RUNTIME_PROFILE!r}; expected one of {', '.join(RUNTIME_PROFILES)}")
+# Where the optimized graph is saved and, on later starts, loaded from
+# without optimizing again; the profile name is added to the file name, as
+# profiles optimize to different levels. Empty disables it.
+OPTIMIZED_MODEL_PATH = os.getenv("EMBED_OPTIMIZED_MODEL_PATH", "")
+
+# Longer texts are truncated (all-MiniLM-L6-v2 was trained on 256 tokens)
+MAX_SEQ_LENGTH = int(os.getenv("EMBED_MAX_SEQ_LENGTH", "256"))
+# A batch is split into length buckets so that at most this fraction of each
+# bucket is padding, and no bucket exceeds EMBED_MAX_BUCKET_TOKENS (rows x length)
+MAX_PADDING_WASTE = float(os.getenv("EMBED_MAX_PADDING_WASTE", "0.2"))
+MAX_BUCKET_TOKENS = int(os.getenv("EMBED_MAX_BUCKET_TOKENS", "16384"))
+# onnxruntime and tokenizers are imported when the model is loaded, so HTTP
+# workers that send their batches to inference_server.py never load them
+OPTIMIZATION_LEVELS = {
+    "disabled": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+
+def session_options(profile, optimization=None):
+    import onnxruntime as ort
+
+    settings = RUNTIME_PROFILES[profile]
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(os.getenv("ORT_INTRA_OP_THREADS", settings["intra_op_threads"]))
+    options.inter_op_num_threads = int(os.getenv("ORT_INTER_OP_THREADS", settings["inter_op_threads"]))
+    options.execution_mode = getattr(ort.ExecutionMode, EXECUTION_MODES[settings["execution_mode"]])
+    options.graph_optimization_level = getattr(
+        ort.GraphOptimizationLevel, OPTIMIZATION_LEVELS[optimization or settings["optimization"]]
+    )
+    options.enable_mem_pattern = settings["memory_arena"]
+    options.enable_cpu_mem_arena = settings["memory_arena"]
+    options.add_session_config_entry("session.intra_op.allow_spinning", "1" if settings["allow_spinning"] else "0")
+    return options
+
+def profile_model_path(path, profile):
+    """`path` with the profile name before the extension: model.onnx -> model-latency.onnx."""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{profile}{ext}"
+
+def create_session(model_path, profile, optimized_path=OPTIMIZED_MODEL_PATH):
+    """
+    Returns (session, status). With `optimized_path` set, the first start
+    saves the graph optimized for `profile` next to it (see
+    profile_model_path) and later starts with that profile load it as-is.
+    """
+    import onnxruntime as ort
+
+    if optimized_path:
+        optimized_path = profile_model_path(optimized_path, profile)
+    status = dict(RUNTIME_PROFILES[profile], profile=profile, model_path=model_path, optimized_model=None)
+    if optimized_path and os.path.exists(optimized_path):
+        session = ort.InferenceSession(
+            optimized_path, sess_options=session_options(profile, "disabled"), providers=['CPUExecutionProvider']
+        )
+        status["optimized_model"] = optimized_path
+    else:
+        options = session_options(profile)
+        if optimized_path:
+            options.optimized_model_filepath = optimized_path
+            status["optimized_model"] = optimized_path
+        session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+    options = session.get_session_options()
+    status["intra_op_threads"] = options.intra_op_num_threads
+    status["inter_op_threads"] = options.inter_op_num_threads
+    status["providers"] = session.get_providers()
+    return session, status
+
+tokenizer = None
+sess = None
+runtime_status = None
+
+def load_model():
+    """Load the tokenizer and ONNX session once per process; returns the runtime status."""
+    global tokenizer, sess, runtime_status
+    if sess is not None:
+        return runtime_status
+    from tokenizers import Tokenizer
+
+    # load tokenizer (fast/tokenizers) and onnx session once
+    try:
+        tokenizer = Tokenizer.from_file(TOKENIZER_PATH)
+        tokenizer.no_padding()  # run_onnx pads per length bucket
+        tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+    except Exception as e:
+        raise RuntimeError(f'Failed to load tokenizer at {TOKENIZER_PATH}: {e}')
+    # create ONNX Runtime session with the threading and memory settings of the active profile
+    try:
+        sess, runtime_status = create_session(MODEL_PATH, RUNTIME_PROFILE)
+    except Exception as e:
+        raise RuntimeError(f'Failed to load ONNX model at {MODEL_PATH}: {e}')
+    return runtime_status
+
+def cache_namespace():
+    # Cached vectors are only valid for this model file and truncation length
+    return f"{os.path.basename(MODEL_PATH)}:{os.path.getsize(MODEL_PATH)}:{MAX_SEQ_LENGTH}"
+
+def length_buckets(lengths, max_waste=MAX_PADDING_WASTE, max_tokens=MAX_BUCKET_TOKENS):
+    """
+    Group row indices by length: rows are taken shortest first and a bucket
+    is closed when adding the next row would make more than `max_waste` of
+    its padded size padding, or the padded size exceed `max_tokens`.
+    """
+    order = np.argsort(lengths, kind="stable")
+    buckets, current, real = [], [], 0
+    for i in order:
+        length = int(lengths[i])
+        padded = (len(current) + 1) * length
+        if current and (padded > max_tokens or 1 - (real + length) / padded > max_waste):
+            buckets.append(current)
+            current, real = [], 0
+        current.append(i)
+        real += length
+    if current:
+        buckets.append(current)
+    return buckets
+
+def pad_batch(ids_list, lengths):
+    """Right-padded input_ids and attention_mask for one bucket, without a per-row loop."""
+    mask = np.arange(lengths.max()) < lengths[:, None]
+    input_ids = np.zeros(mask.shape, dtype=np.int64)
+    input_ids[mask] = np.concatenate(ids_list)
+    return input_ids, mask.astype(np.int64)
+
+def run_onnx(texts: List[str]):
+    # Tokenize using the fast `tokenizers` Tokenizer to avoid loading `transformers` at runtime
+    ids_list = [e.ids for e in tokenizer.encode_batch(texts)]
+    lengths = np.fromiter((len(ids) for ids in ids_list), dtype=np.int64, count=len(ids_list))
+
+    result = None
+    for bucket in length_buckets(lengths):
+        input_ids, attention_mask = pad_batch([ids_list[i] for i in bucket], lengths[bucket])
+        # outs[0] is pooled embeddings
+        pooled = sess.run(None, {'input_ids': input_ids, 'attention_mask': attention_mask})[0]
+        if result is None:
+            result = np.empty((len(texts), pooled.shape[1]), dtype=pooled.dtype)
+        result[bucket] = pooled  # back to request order
+    return result
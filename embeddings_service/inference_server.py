@@ -0,0 +1,150 @@
+"""
+Single inference process for multi-worker deployments. It loads the
+tokenizer and ONNX model once; the uvicorn workers of main.py send it their
+micro-batches over a Unix socket, so model memory does not grow with the
+number of workers. start.sh runs it when EMBED_WORKERS > 1.
+
+    EMBED_INFERENCE_SOCKET=/tmp/embed-inference.sock python inference_server.py
+
+Frames in both directions are a status byte and a payload length, then the
+payload. Requests are JSON ({"op": "embed", "texts": [...]} or {"op": "status"});
+embed replies are the row count and dimension followed by little-endian
+float32 rows.
+"""
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+import inference
+from embedding_cache import EmbeddingCache
+
+SOCKET_PATH = os.getenv("EMBED_INFERENCE_SOCKET", "/tmp/embed-inference.sock")
+
+HEADER = struct.Struct("!BQ")  # status, payload length
+SHAPE = struct.Struct("!II")   # rows, dimension
+OK, ERROR, JSON = 0, 1, 2
+
+
+def send_frame(sock, status, payload):
+    sock.sendall(HEADER.pack(status, len(payload)))
+    sock.sendall(payload)
+
+
+def recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionError("inference socket closed")
+        view = view[received:]
+    return buffer
+
+
+def recv_frame(sock):
+    status, length = HEADER.unpack(recv_exact(sock, HEADER.size))
+    return status, recv_exact(sock, length)
+
+
+class InferenceClient:
+    """Blocking client for the HTTP workers: one connection, reopened after an error."""
+
+    def __init__(self, path=SOCKET_PATH, timeout=None):
+        self.path = path
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _call(self, request):
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self._sock.settimeout(self.timeout)
+                    self._sock.connect(self.path)
+                send_frame(self._sock, OK, json.dumps(request).encode("utf-8"))
+                status, payload = recv_frame(self._sock)
+            except OSError:
+                if self._sock is not None:
+                    self._sock.close()
+                self._sock = None
+                raise
+        if status == ERROR:
+            raise RuntimeError(payload.decode("utf-8"))
+        return payload
+
+    def run(self, texts):
+        payload = self._call({"op": "embed", "texts": list(texts)})
+        rows, dim = SHAPE.unpack_from(payload)
+        return np.frombuffer(payload, dtype="<f4", offset=SHAPE.size).reshape(rows, dim)
+
+    def status(self):
+        return json.loads(self._call({"op": "status"}))
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                _, payload = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                request = json.loads(payload)
+                if request.get("op") == "status":
+                    send_frame(self.request, JSON, json.dumps(self.server.status()).encode("utf-8"))
+                    continue
+                vectors = np.ascontiguousarray(self.server.embed(request["texts"]), dtype="<f4")
+            except Exception as e:
+                send_frame(self.request, ERROR, str(e).encode("utf-8"))
+                continue
+            send_frame(self.request, OK, SHAPE.pack(*vectors.shape) + vectors.tobytes())
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """One connection thread per worker; session runs may overlap (ONNX Runtime allows concurrent runs)."""
+
+    daemon_threads = True
+
+    def __init__(self, path, cache):
+        if os.path.exists(path):
+            os.unlink(path)  # left over from a previous run
+        self.runtime = inference.load_model()
+        self.cache = cache
+        self._cache_lock = threading.Lock()
+        super().__init__(path, _Handler)
+
+    def embed(self, texts):
+        with self._cache_lock:
+            keys, vectors, missing = self.cache.lookup_many(texts)
+        computed = inference.run_onnx(list(missing.values())) if missing else None
+        with self._cache_lock:
+            return self.cache.fill(keys, vectors, missing, computed)
+
+    def status(self):
+        with self._cache_lock:
+            cache = self.cache.stats()
+        return {"pid": os.getpid(), "runtime": self.runtime, "cache": cache}
+
+
+def main():
+    cache = EmbeddingCache(namespace=inference.cache_namespace())
+    server = InferenceServer(SOCKET_PATH, cache)
+    # shutdown() blocks until serve_forever returns, so it needs its own thread
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Inference server listening on {SOCKET_PATH} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        cache.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,28 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import io
 import os
 import numpy as np
-import onnxruntime as ort
-from tokenizers import Tokenizer
+
+from embedding_cache import CACHE_DIR, EmbeddingCache
+from inference import RUNTIME_PROFILE, RUNTIME_PROFILES, cache_namespace
 
 app = FastAPI()
 
-MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "./model-quant.onnx")
-TOKENIZER_PATH = os.getenv("TOKENIZER_PATH", "./tokenizer/tokenizer.json")
+# Concurrent requests are merged into one session run: a batch closes after
+# EMBED_MAX_WAIT_MS or once it holds EMBED_MAX_BATCH_SIZE texts
+MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", RUNTIME_PROFILES[RUNTIME_PROFILE]["max_batch_size"]))
+MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", RUNTIME_PROFILES[RUNTIME_PROFILE]["max_wait_ms"]))
+# With several uvicorn workers (start.sh, EMBED_WORKERS > 1) the model is
+# loaded once, by inference_server.py; workers only handle HTTP and send
+# their batches over this Unix socket
+INFERENCE_SOCKET = os.getenv("EMBED_INFERENCE_SOCKET", "")
 
 class EmbedRequest(BaseModel):
     texts: List[str]
@@ -17,60 +30,209 @@ class EmbedRequest(BaseModel):
 class EmbedResponse(BaseModel):
     embeddings: List[List[float]]
 
-# load tokenizer (fast/tokenizers) and onnx session once
-try:
-    tokenizer = Tokenizer.from_file(TOKENIZER_PATH)
-except Exception as e:
-    raise RuntimeError(f'Failed to load tokenizer at {TOKENIZER_PATH}: {e}')
-# create ONNX Runtime session with conservative threading and memory options to reduce RAM usage
-try:
-    sess_options = ort.SessionOptions()
-    # reduce thread usage
-    try:
-        sess_options.intra_op_num_threads = 1
-        sess_options.inter_op_num_threads = 1
-    except Exception:
-        pass
-    # favor sequential execution and reduce arena/mempattern allocations
-    try:
-        from onnxruntime import ExecutionMode, GraphOptimizationLevel
-        sess_options.execution_mode = ExecutionMode.ORT_SEQUENTIAL
-        sess_options.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_BASIC
-    except Exception:
-        pass
-    try:
-        sess_options.enable_mem_pattern = False
-        sess_options.enable_cpu_mem_arena = False
-    except Exception:
-        pass
-
-    sess = ort.InferenceSession(MODEL_PATH, sess_options=sess_options, providers=['CPUExecutionProvider'])
-except Exception as e:
-    raise RuntimeError(f'Failed to load ONNX model at {MODEL_PATH}: {e}')
-
-def run_onnx(texts: List[str]):
-    # Tokenize using the fast `tokenizers` Tokenizer to avoid loading `transformers` at runtime
-    encs = [tokenizer.encode(t) for t in texts]
-    ids_list = [e.ids for e in encs]
-    mask_list = [e.attention_mask for e in encs]
-    max_len = max(len(x) for x in ids_list)
-    input_ids = np.zeros((len(ids_list), max_len), dtype='int64')
-    attention_mask = np.zeros((len(ids_list), max_len), dtype='int64')
-    for i, (ids, mask) in enumerate(zip(ids_list, mask_list)):
-        input_ids[i, :len(ids)] = ids
-        attention_mask[i, :len(mask)] = mask
-    ort_inputs = {
-        'input_ids': input_ids.astype('int64'),
-        'attention_mask': attention_mask.astype('int64')
+class MicroBatcher:
+    """
+    Coalesces concurrent /embed requests. The first queued request waits at
+    most `max_wait` seconds for others to join, up to `max_batch_size` texts;
+    the combined batch goes through one `run` call on the inference thread
+    and each caller gets its own slice of the result back.
+    """
+
+    def __init__(self, run, max_batch_size=64, max_wait=0.005):
+        self.run = run
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        self.batch_sizes = Counter()  # power-of-two bucket -> batches
+        self._queue = None
+        self._task = None
+        # One inference thread: session runs are serialized, batching is what
+        # spreads the cost over callers
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="onnx")
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._serve())
+
+    async def embed(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _collect(self, first):
+        loop = asyncio.get_running_loop()
+        items, size = [first], len(first[0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            try:
+                if self._queue.empty():
+                    item = await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                else:
+                    item = self._queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if size + len(item[0]) > self.max_batch_size:
+                return items, item  # starts the next batch
+            items.append(item)
+            size += len(item[0])
+        return items, None
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        carry = None
+        while True:
+            first = carry or await self._queue.get()
+            items, carry = await self._collect(first)
+            items = [(texts, future) for texts, future in items if not future.done()]
+            texts = [text for item_texts, _ in items for text in item_texts]
+            if not texts:
+                continue
+            try:
+                vectors = await loop.run_in_executor(self._executor, self.run, texts)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self._record(len(texts))
+            offset = 0
+            for item_texts, future in items:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    def _record(self, size):
+        self.batches += 1
+        self.texts += size
+        self.largest_batch = max(self.largest_batch, size)
+        self.batch_sizes[1 << (size.bit_length() - 1)] += 1
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            # "4" counts batches of 4-7 texts
+            "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+if INFERENCE_SOCKET:
+    from inference_server import InferenceClient
+    inference_client = InferenceClient(INFERENCE_SOCKET)
+    # Own connection, so health checks do not queue behind a running batch
+    health_client = InferenceClient(INFERENCE_SOCKET, timeout=5)
+    run_batch = inference_client.run
+else:
+    import inference
+    inference.load_model()
+    inference_client = health_client = None
+    run_batch = inference.run_onnx
+
+batcher = MicroBatcher(run_batch, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT_MS / 1000)
+
+# The on-disk store has a single writer: the inference server when there is
+# one, otherwise this process
+cache = EmbeddingCache(namespace=cache_namespace(), directory=None if INFERENCE_SOCKET else CACHE_DIR or None)
+
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
+
+@app.on_event("shutdown")
+async def flush_cache():
+    cache.flush()
+
+async def embed_texts(texts):
+    """Embeddings for `texts` in order; only texts not in the cache are run, each once."""
+    if not cache.enabled:
+        return await batcher.embed(texts)
+    keys, vectors, missing = cache.lookup_many(texts)
+    computed = await batcher.embed(list(missing.values())) if missing else None
+    return cache.fill(keys, vectors, missing, computed)
+
+# Response encodings for /embed. JSON stays the default; bulk clients can
+# skip float formatting with raw bytes, base64 or .npy:
+#   json    {"embeddings": [[...], ...]}
+#   base64  {"embeddings_b64": "...", "shape": [n, dim], "dtype": "float32"}
+#   binary  application/octet-stream, row-major little-endian, shape in X-Embedding-Shape
+#   npy     application/x-npy, a NumPy .npy file
+FORMATS = ("json", "base64", "binary", "npy")
+DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+def negotiate_format(accept, requested=None):
+    """?format= wins; otherwise the Accept header picks binary or npy, else JSON."""
+    if requested:
+        return requested
+    accept = (accept or "").lower()
+    if "application/x-npy" in accept:
+        return "npy"
+    if "application/octet-stream" in accept:
+        return "binary"
+    return "json"
+
+def encode_embeddings(vectors, fmt, dtype):
+    array = np.ascontiguousarray(vectors, dtype=DTYPES[dtype])
+    headers = {
+        "X-Embedding-Shape": f"{array.shape[0]},{array.shape[1]}",
+        "X-Embedding-Dtype": dtype,
+        "Vary": "Accept",
     }
-    outs = sess.run(None, ort_inputs)
-    # outs[0] is pooled embeddings
-    return [o.tolist() for o in outs[0]]
+    if fmt == "binary":
+        return Response(array.tobytes(), media_type="application/octet-stream", headers=headers)
+    if fmt == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        return Response(buffer.getvalue(), media_type="application/x-npy", headers=headers)
+    if fmt == "base64":
+        return JSONResponse({
+            "embeddings_b64": base64.b64encode(array.tobytes()).decode("ascii"),
+            "shape": list(array.shape),
+            "dtype": dtype,
+        }, headers=headers)
+    return JSONResponse({"embeddings": array.tolist()}, headers=headers)
 
 @app.post("/embed", response_model=EmbedResponse)
-async def embed(req: EmbedRequest):
+async def embed(
+    req: EmbedRequest,
+    request: Request,
+    format: Optional[str] = Query(None, description=f"One of {', '.join(FORMATS)}; overrides the Accept header"),
+    dtype: str = Query("float32", description="float32 or float16"),
+):
+    fmt = negotiate_format(request.headers.get("accept"), format)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    if dtype not in DTYPES:
+        raise HTTPException(status_code=400, detail=f"dtype must be one of {', '.join(DTYPES)}")
+    if not req.texts:
+        return encode_embeddings(np.empty((0, 0)), fmt, dtype)
     try:
-        embs = run_onnx(req.texts)
-        return {"embeddings": embs}
+        embs = await embed_texts(req.texts)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return encode_embeddings(embs, fmt, dtype)
+
+@app.get("/status")
+async def status():
+    if inference_client is not None:
+        server = await asyncio.get_running_loop().run_in_executor(None, inference_client.status)
+        return {"runtime": server["runtime"], "batching": batcher.stats(), "cache": cache.stats(), "inference_server": server}
+    return {"runtime": inference.runtime_status, "batching": batcher.stats(), "cache": cache.stats()}
+
+@app.get("/health")
+async def health():
+    if health_client is not None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, health_client.status)
+        except Exception as e:
+            return JSONResponse({"status": "error", "detail": f"inference server: {e}"}, status_code=503)
+    return {"status": "ok"}
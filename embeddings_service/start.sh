@@ -0,0 +1,54 @@
+#!/bin/sh
+# Starts the embeddings service. With EMBED_WORKERS > 1 the model is loaded
+# once by inference_server.py and the uvicorn workers only serve HTTP; this
+# script then stays in the foreground and supervises both processes.
+set -e
+WORKERS="${EMBED_WORKERS:-1}"
+PORT="${PORT:-8000}"
+
+if [ "$WORKERS" -le 1 ]; then
+  exec uvicorn main:app --host 0.0.0.0 --port "$PORT" --workers 1
+fi
+
+export EMBED_INFERENCE_SOCKET="${EMBED_INFERENCE_SOCKET:-/tmp/embed-inference.sock}"
+rm -f "$EMBED_INFERENCE_SOCKET"
+python inference_server.py &
+SERVER=$!
+APP=
+
+# HTTP workers stop first so in-flight requests finish; the inference
+# server then flushes its cache on SIGTERM
+stop() {
+  if [ -n "$APP" ]; then
+    kill -TERM "$APP" 2>/dev/null || true
+    wait "$APP" 2>/dev/null || true
+  fi
+  kill -TERM "$SERVER" 2>/dev/null || true
+  wait "$SERVER" 2>/dev/null || true
+}
+trap 'stop; exit 0' TERM INT
+
+# Wait until the model is loaded and the socket is listening
+tries=0
+until [ -S "$EMBED_INFERENCE_SOCKET" ]; do
+  tries=$((tries + 1))
+  if [ "$tries" -gt 600 ] || ! kill -0 "$SERVER" 2>/dev/null; then
+    echo "Inference server did not start" >&2
+    stop
+    exit 1
+  fi
+  sleep 0.1
+done
+
+uvicorn main:app --host 0.0.0.0 --port "$PORT" --workers "$WORKERS" &
+APP=$!
+
+# Without the inference server every /embed fails, so when either process
+# exits, stop the other and exit non-zero to let the container restart
+while kill -0 "$SERVER" 2>/dev/null && kill -0 "$APP" 2>/dev/null; do
+  sleep 1 &
+  wait $! || true
+done
+echo "Inference server or uvicorn exited; stopping" >&2
+stop
+exit 1
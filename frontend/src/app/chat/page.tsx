@@ -3,7 +3,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Send, Bot, User, Sparkles, Trash2, ArrowRight } from 'lucide-react';
-import { sendChatMessage } from '@/lib/api';
+import { streamChatMessage } from '@/lib/api';
 import { v4 as uuidv4 } from 'uuid';
 
 interface Message {
@@ -17,6 +17,7 @@ export default function ChatPage() {
     const [messages, setMessages] = useState<Message[]>([]);
     const [input, setInput] = useState('');
     const [isLoading, setIsLoading] = useState(false);
+    const [toolStatus, setToolStatus] = useState<string | null>(null);
     const [sessionId, setSessionId] = useState('');
     const scrollRef = useRef<HTMLDivElement>(null);
 
@@ -62,15 +63,26 @@ export default function ChatPage() {
         setInput('');
         setIsLoading(true);
 
+        const botId = uuidv4();
+        let started = false;
+        const setBotText = (update: (text: string) => string) => {
+            if (!started) {
+                started = true;
+                setIsLoading(false);
+                setMessages(prev => [...prev, { id: botId, text: update(''), sender: 'bot', timestamp: new Date() }]);
+            } else {
+                setMessages(prev => prev.map(m => m.id === botId ? { ...m, text: update(m.text) } : m));
+            }
+        };
+
         try {
-            const res = await sendChatMessage(currentInput, sessionId);
-            const botMessage: Message = {
-                id: uuidv4(),
-                text: res.response,
-                sender: 'bot',
-                timestamp: new Date()
-            };
-            setMessages(prev => [...prev, botMessage]);
+            const response = await streamChatMessage(currentInput, sessionId, {
+                onToolStart: (tool) => setToolStatus(`Zoekt via ${tool}...`),
+                onToolEnd: () => setToolStatus(null),
+                onToken: (token) => setBotText(text => text + token),
+            });
+            // The final answer is authoritative (the token stream may include format residue)
+            setBotText(() => response);
         } catch (error) {
             console.error("Chat error:", error);
             const errorMessage: Message = {
@@ -82,6 +94,7 @@ export default function ChatPage() {
             setMessages(prev => [...prev, errorMessage]);
         } finally {
             setIsLoading(false);
+            setToolStatus(null);
         }
     };
 
@@ -168,7 +181,7 @@ export default function ChatPage() {
                                 <span className="w-1.5 h-1.5 bg-primary rounded-full animate-bounce" style={{ animationDelay: '150ms' }} />
                                 <span className="w-1.5 h-1.5 bg-primary rounded-full animate-bounce" style={{ animationDelay: '300ms' }} />
                             </div>
-                            <span className="text-xs text-slate-500 font-medium tracking-wide">Assistant denkt na...</span>
+                            <span className="text-xs text-slate-500 font-medium tracking-wide">{toolStatus ?? 'Assistant denkt na...'}</span>
                         </div>
                     </motion.div>
                 )}
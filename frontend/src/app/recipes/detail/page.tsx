@@ -3,7 +3,7 @@
 import React, { useEffect, useState, Suspense } from 'react';
 import { useSearchParams } from 'next/navigation';
 import { RecipeDetail } from '@/components/RecipeDetail';
-import { fetchRecipeDetails } from '@/lib/api';
+import { streamRecipeDetails } from '@/lib/api';
 import { Recipe } from '@/types';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Loader2 } from 'lucide-react';
@@ -22,8 +22,15 @@ function RecipeDetailContent() {
 
             try {
                 setLoading(true);
-                const res = await fetchRecipeDetails(id);
-                setData(res);
+                // Render the recipe first; related recipes are filled in when they arrive
+                await streamRecipeDetails(
+                    id,
+                    (res) => {
+                        setData({ ...res, related: [] });
+                        setLoading(false);
+                    },
+                    (related) => setData(prev => prev ? { ...prev, related } : prev),
+                );
             } catch (err) {
                 console.error("Error loading recipe:", err);
                 setError("Kon het recept niet laden. Probeer het later opnieuw.");
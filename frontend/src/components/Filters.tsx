@@ -1,7 +1,8 @@
 'use client';
 
-import React from 'react';
-import { FilterOptions } from '@/types';
+import React, { useEffect, useRef, useState } from 'react';
+import { FilterOptions, IngredientSuggestion } from '@/types';
+import { fetchIngredientSuggestions } from '@/lib/api';
 import { ChevronDown, ChevronUp, X } from 'lucide-react';
 
 interface FiltersProps {
@@ -13,6 +14,44 @@ interface FiltersProps {
 
 export const Filters: React.FC<FiltersProps> = ({ options, selected, onChange, onReset }) => {
     const hasFilters = Object.values(selected).some(v => v.length > 0);
+    const [ingredientQuery, setIngredientQuery] = useState('');
+    const [suggestions, setSuggestions] = useState<IngredientSuggestion[]>([]);
+    const submitting = useRef(false);
+
+    useEffect(() => {
+        // Debounced per-keystroke lookup instead of shipping every ingredient
+        const handle = setTimeout(() => {
+            fetchIngredientSuggestions(ingredientQuery)
+                .then(setSuggestions)
+                .catch(err => console.error("Error loading ingredient suggestions:", err));
+        }, 150);
+        return () => clearTimeout(handle);
+    }, [ingredientQuery]);
+
+    const findIngredient = (list: IngredientSuggestion[], val: string) =>
+        list.find(s => s.name.toLowerCase() === val.trim().toLowerCase());
+
+    // The suggestion list lags the input by the debounce, so a value typed
+    // quickly is checked against the server before it is rejected
+    const submitIngredient = async () => {
+        const val = ingredientQuery;
+        // Enter followed by blur must not add (and thereby toggle) twice
+        if (!val.trim() || submitting.current) return;
+        submitting.current = true;
+        let match = findIngredient(suggestions, val);
+        if (!match) {
+            try {
+                match = findIngredient(await fetchIngredientSuggestions(val), val);
+            } catch (err) {
+                console.error("Error checking ingredient:", err);
+            }
+        }
+        submitting.current = false;
+        if (match && !selected.ingredients?.includes(match.name)) {
+            onChange('ingredients', match.name);
+            setIngredientQuery('');
+        }
+    };
 
     return (
         <div className="space-y-8 glass p-6 rounded-2xl md:sticky md:top-24">
@@ -109,26 +148,18 @@ export const Filters: React.FC<FiltersProps> = ({ options, selected, onChange, o
                     list="ingredient-options"
                     placeholder="Zoek ingrediënt..."
                     className="w-full bg-white/5 border border-white/5 rounded-xl px-4 py-2 text-sm text-slate-300 outline-none focus:border-primary/50 transition-all shadow-xl"
+                    value={ingredientQuery}
+                    onChange={(e) => setIngredientQuery(e.target.value)}
                     onKeyDown={(e) => {
                         if (e.key === 'Enter') {
-                            const val = (e.currentTarget as HTMLInputElement).value;
-                            if (val && options.ingredients.includes(val)) {
-                                onChange('ingredients', val);
-                                (e.currentTarget as HTMLInputElement).value = '';
-                            }
-                        }
-                    }}
-                    onBlur={(e) => {
-                        const val = (e.currentTarget as HTMLInputElement).value;
-                        if (val && options.ingredients.includes(val)) {
-                            onChange('ingredients', val);
-                            (e.currentTarget as HTMLInputElement).value = '';
+                            submitIngredient();
                         }
                     }}
+                    onBlur={submitIngredient}
                 />
                 <datalist id="ingredient-options">
-                    {options.ingredients.map(ing => (
-                        <option key={ing} value={ing} />
+                    {suggestions.map(ing => (
+                        <option key={ing.name} value={ing.name}>{ing.recipeCount} recepten</option>
                     ))}
                 </datalist>
 
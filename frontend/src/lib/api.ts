@@ -1,4 +1,4 @@
-import { SearchResponse, Recipe, CategoryCount, FilterOptions } from '../types';
+import { SearchResponse, Recipe, CategoryCount, FilterOptions, IngredientSuggestion } from '../types';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api';
 
@@ -26,6 +26,40 @@ export async function fetchRecipeDetails(id: string): Promise<{ recipe: Recipe;
     return res.json();
 }
 
+/**
+ * Streams recipe details as NDJSON: `onRecipe` fires as soon as the recipe is
+ * available, `onRelated` once the (slower) related-recipes lookup is done.
+ */
+export async function streamRecipeDetails(
+    id: string,
+    onRecipe: (data: { recipe: Recipe; ingredients: any[] }) => void,
+    onRelated: (related: any[]) => void,
+): Promise<void> {
+    const res = await fetch(`${API_BASE_URL}/recipes/${encodeURIComponent(id)}?stream=true`);
+    if (!res.ok || !res.body) throw new Error('Failed to fetch recipe details');
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const handleLine = (line: string) => {
+        if (!line.trim()) return;
+        const part = JSON.parse(line);
+        if (part.recipe) onRecipe(part);
+        if (part.related) onRelated(part.related);
+    };
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() ?? '';
+        lines.forEach(handleLine);
+    }
+    handleLine(buffer);
+}
+
 export async function fetchCategories(type: string): Promise<CategoryCount[]> {
     const res = await fetch(`${API_BASE_URL}/categories?type=${type}`);
     if (!res.ok) throw new Error('Failed to fetch categories');
@@ -40,11 +74,18 @@ export async function fetchIngredientsAZ(letter?: string): Promise<{ name: strin
 }
 
 export async function fetchFilters(): Promise<FilterOptions> {
-    const res = await fetch(`${API_BASE_URL}/filters`);
+    // Ingredients come from the suggest endpoint instead of the full list
+    const res = await fetch(`${API_BASE_URL}/filters?ingredients=false`);
     if (!res.ok) throw new Error('Failed to fetch filters');
     return res.json();
 }
 
+export async function fetchIngredientSuggestions(query: string, limit = 10): Promise<IngredientSuggestion[]> {
+    const res = await fetch(`${API_BASE_URL}/ingredients/suggest?q=${encodeURIComponent(query)}&limit=${limit}`);
+    if (!res.ok) throw new Error('Failed to fetch ingredient suggestions');
+    return res.json();
+}
+
 export async function sendChatMessage(message: string, sessionId: string): Promise<{ response: string }> {
     const res = await fetch(`${API_BASE_URL}/chat`, {
         method: 'POST',
@@ -54,3 +95,53 @@ export async function sendChatMessage(message: string, sessionId: string): Promi
     if (!res.ok) throw new Error('Failed to send message');
     return res.json();
 }
+
+export interface ChatStreamHandlers {
+    onToolStart?: (tool: string, input: string) => void;
+    onToolEnd?: (tool: string, output: string) => void;
+    onToken?: (text: string) => void;
+}
+
+/**
+ * Streams a chat answer over Server-Sent Events. Resolves with the complete
+ * final answer; tokens and tool steps are reported through `handlers`.
+ */
+export async function streamChatMessage(message: string, sessionId: string, handlers: ChatStreamHandlers = {}): Promise<string> {
+    const res = await fetch(`${API_BASE_URL}/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+        body: JSON.stringify({ message, session_id: sessionId }),
+    });
+    if (!res.ok || !res.body) throw new Error('Failed to send message');
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let response: string | null = null;
+
+    const handleEvent = (block: string) => {
+        const data = block.split('\n').filter(line => line.startsWith('data:')).map(line => line.slice(5)).join('\n');
+        if (!data.trim()) return;
+        const event = JSON.parse(data);
+        switch (event.type) {
+            case 'tool_start': handlers.onToolStart?.(event.tool, event.input); break;
+            case 'tool_end': handlers.onToolEnd?.(event.tool, event.output); break;
+            case 'token': handlers.onToken?.(event.text); break;
+            case 'done': response = event.response; break;
+            case 'error': throw new Error(event.detail || 'Failed to send message');
+        }
+    };
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop() ?? '';
+        blocks.forEach(handleEvent);
+    }
+    handleEvent(buffer);
+
+    if (response === null) throw new Error('Chat stream ended without an answer');
+    return response;
+}
@@ -14,6 +14,8 @@ export interface Recipe {
 export interface SearchResponse {
     recipes: Recipe[];
     total: number;
+    mode?: 'index' | 'single' | 'concurrent' | 'sequential' | 'keyset';
+    next_cursor?: string | null;
 }
 
 export interface CategoryCount {
@@ -29,3 +31,9 @@ export interface FilterOptions {
     ingredients: string[];
     main_ingredients: string[];
 }
+
+export interface IngredientSuggestion {
+    name: string;
+    recipeCount: number;
+    match: 'prefix' | 'synonym' | 'fuzzy';
+}
@@ -1,34 +1,20 @@
+import json
 from collections import Counter
+from pathlib import Path
+
+# alias -> label used in the graph; the backend image ships this file too
+SYNONYMS_PATH = Path(__file__).resolve().parent.parent / "backend" / "app" / "data" / "ingredient_synonyms.json"
+
+
+def load_synonym_map():
+    with open(SYNONYMS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
 
 class Consolidator:
-    # Common typos and variations in Indonesian ingredients
-    SYNONYM_MAP = {
-        "jeruk perut": "jeruk purut",
-        "jerur purut": "jeruk purut",
-        "jerur purutblaadjes": "jeruk purut",
-        "jeruk perutblaadjes": "jeruk purut",
-        "jeruk purutblaadjes": "jeruk purut",
-        "tjabe": "cabai",
-        "lombok": "cabai",
-        "jahe": "gember",
-        "djahé": "gember",
-        "djahe": "gember",
-        "laos": "lengkuas",
-        "sereh": "citroengras",
-        "serai": "citroengras",
-        "kunjit": "kurkuma",
-        "kunyit": "kurkuma",
-        "trassi": "terasi",
-        "trasi": "terasi",
-        "kencur": "kentjoer",
-        "djinten": "jinten",
-        "ketjap": "kecap",
-        "ketjap manis": "kecap manis",
-        "santen": "kokosmelk",
-        "daun salam": "salam blad",
-        "salamblaadjes": "salam blad",
-        "hoofdbestanddeel": "ingrediënt",
-    }
+    # Common typos and variations in Indonesian ingredients, shared with the
+    # backend's ingredient autocomplete
+    SYNONYM_MAP = load_synonym_map()
 
     def __init__(self, min_frequency=2):
         self.min_frequency = min_frequency # Threshold for promoting a tag to a category
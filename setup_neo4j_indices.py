@@ -6,7 +6,10 @@ commands = [
     "CREATE INDEX IF NOT EXISTS FOR ()-[r:LAST_MESSAGE]-() ON ()",
     "CREATE INDEX IF NOT EXISTS FOR ()-[r:NEXT]-() ON ()",
     "CREATE INDEX IF NOT EXISTS FOR (m:Message) ON (m.content)",
-    "CREATE INDEX IF NOT EXISTS FOR (m:Message) ON (m.type)"
+    "CREATE INDEX IF NOT EXISTS FOR (m:Message) ON (m.type)",
+    # Keyset pagination of /api/recipes seeks on (schema__name, uri)
+    "CREATE INDEX IF NOT EXISTS FOR (r:schema__Recipe) ON (r.schema__name, r.uri)",
+    "CREATE INDEX IF NOT EXISTS FOR (r:schema__Recipe) ON (r.uri)"
 ]
 
 for cmd in commands:
@@ -16,4 +19,4 @@ for cmd in commands:
     except Exception as e:
         print(f"Error: {e}")
 
-print("Neo4j session history indices initialized (if possible).")
+print("Neo4j indices initialized (if possible).")
@@ -2,6 +2,7 @@ from rdflib import Graph, Namespace
 from neo4j import GraphDatabase
 import json
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -71,5 +72,10 @@ with driver.session() as session:
         session.execute_write(update_batch, batch)
         print(f"Ingested {count} total embeddings.")
 
+    # Bump the data version so the API rebuilds its caches
+    version = time.strftime("%Y%m%dT%H%M%S")
+    session.run("MERGE (v:kb__DataVersion {id: 'graph'}) SET v.version = $version", version=version)
+    print(f"Data version set to {version}.")
+
 driver.close()
-print("Done.")
+print("Done. Run tools/precompute_related_recipes.py to refresh the related recipes.")
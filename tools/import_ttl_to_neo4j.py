@@ -2,8 +2,10 @@ from rdflib_neo4j import Neo4jStoreConfig
 from rdflib_neo4j import HANDLE_VOCAB_URI_STRATEGY
 from rdflib_neo4j import Neo4jStore
 from rdflib import Graph, Namespace
+from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import os
+import time
 
 load_dotenv()
 
@@ -58,5 +60,15 @@ try:
             
     graph_store.close(True)
     print("Import completed successfully.")
+
+    # Bump the data version so the API rebuilds its caches (filters, search index)
+    version = time.strftime("%Y%m%dT%H%M%S")
+    with GraphDatabase.driver(auth_data['uri'], auth=(auth_data['user'], auth_data['pwd'])) as driver:
+        driver.execute_query(
+            "MERGE (v:kb__DataVersion {id: 'graph'}) SET v.version = $version",
+            version=version,
+            database_=auth_data['database'],
+        )
+    print(f"Data version set to {version}.")
 except Exception as e:
     print(f"Error during import: {e}")
\ No newline at end of file
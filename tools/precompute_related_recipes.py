@@ -0,0 +1,107 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+load_dotenv()
+
+# --- Neo4j connectie ---
+uri = os.getenv("NEO4J_URI")
+user = os.getenv("NEO4J_USERNAME")
+pwd = os.getenv("NEO4J_PASSWORD")
+database = os.getenv("NEO4J_DATABASE", "neo4j")
+
+LOAD_QUERY = """
+MATCH (r:schema__Recipe)
+WHERE r.hasVectorEmbedding IS NOT NULL
+RETURN r.uri AS uri, r.hasVectorEmbedding AS embedding
+"""
+
+CLEAR_QUERY = """
+MATCH (:schema__Recipe)-[s:kb__similarTo]->(:schema__Recipe)
+CALL { WITH s DELETE s } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+WRITE_QUERY = """
+UNWIND $batch AS row
+MATCH (a:schema__Recipe {uri: row.source})
+MATCH (b:schema__Recipe {uri: row.target})
+CREATE (a)-[:kb__similarTo {score: row.score, rank: row.rank}]->(b)
+"""
+
+
+def top_k_neighbours(embeddings, k, block_size=512):
+    """
+    Exact cosine top-k for every row, computed block-wise so the full
+    similarity matrix never has to be in memory. Yields (row, [(col, cos), ...]).
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normalized = embeddings / np.clip(norms, 1e-12, None)
+    k = min(k, len(normalized) - 1)
+
+    for start in range(0, len(normalized), block_size):
+        block = normalized[start:start + block_size]
+        sims = block @ normalized.T
+        rows = np.arange(len(block))
+        sims[rows, start + rows] = -np.inf  # no self-matches
+
+        top = np.argpartition(-sims, k, axis=1)[:, :k]
+        for i, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-sims[i, candidates])]
+            yield start + i, [(int(j), float(sims[i, j])) for j in ordered]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Store the top-K similar recipes as kb__similarTo relationships")
+    p.add_argument("--top_k", type=int, default=12)
+    p.add_argument("--batch_size", type=int, default=1000)
+    args = p.parse_args()
+
+    driver = GraphDatabase.driver(uri, auth=(user, pwd))
+    with driver.session(database=database) as session:
+        print("Loading embeddings from Neo4j...")
+        rows = session.run(LOAD_QUERY).data()
+        if len(rows) < 2:
+            print("Not enough recipes with embeddings.")
+            driver.close()
+            return
+
+        uris = [r["uri"] for r in rows]
+        embeddings = np.asarray([r["embedding"] for r in rows], dtype=np.float32)
+        print(f"Computing top-{args.top_k} neighbours for {len(uris)} recipes...")
+
+        start = time.perf_counter()
+        relationships = []
+        for i, neighbours in top_k_neighbours(embeddings, args.top_k):
+            for rank, (j, cosine) in enumerate(neighbours, start=1):
+                relationships.append({
+                    "source": uris[i],
+                    "target": uris[j],
+                    # Same scale as the cosine vector index: (1 + cos) / 2
+                    "score": (1.0 + cosine) / 2.0,
+                    "rank": rank,
+                })
+        print(f"Computed {len(relationships)} pairs in {time.perf_counter() - start:.1f}s")
+
+        print("Removing previous kb__similarTo relationships...")
+        session.run(CLEAR_QUERY).consume()
+
+        for offset in range(0, len(relationships), args.batch_size):
+            batch = relationships[offset:offset + args.batch_size]
+            session.execute_write(lambda tx: tx.run(WRITE_QUERY, batch=batch).consume())
+            print(f"Written {offset + len(batch)} / {len(relationships)}")
+
+        # Bump the data version so the API rebuilds its caches
+        version = time.strftime("%Y%m%dT%H%M%S")
+        session.run("MERGE (v:kb__DataVersion {id: 'graph'}) SET v.version = $version", version=version)
+        print(f"Data version set to {version}.")
+
+    driver.close()
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()